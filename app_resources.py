@@ -0,0 +1,304 @@
+import threading
+from config import Config
+from startup_profiler import profiler
+from typing import Callable, Dict, Iterable, Optional
+
+
+class ResourceRegistry:
+    def __init__(self):
+        """
+        Process-wide registry of heavy objects (models, DB clients, indexes).
+        Each resource is built once on first use and shared by every session and rerun.
+        """
+        self._factories: Dict[str, Callable[[], object]] = {}
+        self._resources: Dict[str, object] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], object]):
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str):
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+
+        if name not in self._factories:
+            raise KeyError(f"Unknown resource: {name}")
+
+        # Per-resource lock so a slow model load doesn't block unrelated resources
+        with self._locks[name]:
+            resource = self._resources.get(name)
+            if resource is None:
+                resource = self._factories[name]()
+                self._resources[name] = resource
+        return resource
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._resources
+
+    def warmup(self, names: Optional[Iterable[str]] = None):
+        for name in names or list(self._factories):
+            with profiler.timed(f"resource.{name}"):
+                self.get(name)
+
+    def clear(self, name: Optional[str] = None):
+        with self._registry_lock:
+            if name is None:
+                self._resources.clear()
+            else:
+                self._resources.pop(name, None)
+
+
+_snapshot_lock = threading.Lock()
+_snapshot_restored = threading.Event()
+
+
+def ensure_snapshot_restored():
+    """
+    Installs SNAPSHOT_PATH when SNAPSHOT_LOAD_ON_STARTUP is set and the node isn't ready yet.
+    Every resource backed by files the snapshot replaces calls this first, so concurrent callers
+    wait for the swap to finish instead of opening the store or an index mid-replace.
+    """
+    if _snapshot_restored.is_set():
+        return
+    with _snapshot_lock:
+        if _snapshot_restored.is_set():
+            return
+        if Config.SNAPSHOT_LOAD_ON_STARTUP:
+            import snapshot
+
+            if not snapshot.is_node_ready() and Config.SNAPSHOT_PATH.exists():
+                with profiler.timed("snapshot.load"):
+                    snapshot.SnapshotBundle().load()
+        _snapshot_restored.set()
+
+
+def _import_torch():
+    import torch
+    torch.classes.__path__ = []  # keeps Streamlit's file watcher from walking torch.classes
+    return torch
+
+
+def _build_embedding_model():
+    _import_torch()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(Config.EMBEDDING_MODEL_NAME)
+
+
+def _build_chroma_client():
+    ensure_snapshot_restored()
+    from vector_db import ChromaDBClient
+    return ChromaDBClient(
+        collection_name=Config.VECTOR_COLLECTION_NAME,
+        persist_directory=Config.VECTOR_PERSIST_DIRECTORY
+    )
+
+
+def _build_retriever():
+    from data_retriever import DataRetriever
+    return DataRetriever(
+        vector_db_client=registry.get("chroma_client"),
+        embedding_model=registry.get("embedding_model"),
+        facet_index=registry.get("facet_index"),
+        compressed_index=registry.get("compressed_index") if Config.COMPRESSED_SEARCH_ENABLED else None,
+    )
+
+
+def _build_category_index():
+    ensure_snapshot_restored()
+    from category_index import CategoryIndex
+    return CategoryIndex().load_or_build(Config.STYLE_CSV, registry.get("chroma_client"))
+
+
+def _build_persisted_category_index():
+    # Read straight from disk without a staleness check, so the gallery needs neither Chroma nor pandas
+    ensure_snapshot_restored()
+    from category_index import CategoryIndex
+    index = CategoryIndex()
+    index.load()
+    return index
+
+
+def _build_facet_index():
+    ensure_snapshot_restored()
+    from facet_index import FacetIndex
+    return FacetIndex().load_or_build(registry.get("chroma_client"))
+
+
+def _build_compressed_index():
+    ensure_snapshot_restored()
+    from vector_compression import CompressedIndex
+    index = CompressedIndex()
+    if not index.load():
+        print("⚠️ Compressed index not found; run `vector_compression.py build`. Using Chroma search")
+    elif index.is_stale(registry.get("chroma_client")):
+        # Items missing from stage 1 could never be returned, so fall back until it is updated
+        print("⚠️ Compressed index is out of date with the store; using Chroma search")
+        index = CompressedIndex()
+    return index
+
+
+def _build_similar_items():
+    ensure_snapshot_restored()
+    from similar_items import SimilarItemsIndex
+    index = SimilarItemsIndex()
+    if not index.load():
+        print("⚠️ Similar items index not found; run similar_items.py to enable recommendations")
+    return index
+
+
+def _build_thumbnail_cache():
+    ensure_snapshot_restored()
+    from thumbnail_cache import ThumbnailCache
+    return ThumbnailCache()
+
+
+registry = ResourceRegistry()
+registry.register("embedding_model", _build_embedding_model)
+registry.register("chroma_client", _build_chroma_client)
+registry.register("retriever", _build_retriever)
+registry.register("category_index", _build_category_index)
+registry.register("persisted_category_index", _build_persisted_category_index)
+registry.register("facet_index", _build_facet_index)
+registry.register("compressed_index", _build_compressed_index)
+registry.register("similar_items", _build_similar_items)
+registry.register("thumbnail_cache", _build_thumbnail_cache)
+
+
+def get_chroma_client():
+    return registry.get("chroma_client")
+
+
+def get_retriever():
+    return registry.get("retriever")
+
+
+def get_category_index():
+    return registry.get("category_index")
+
+
+def get_gallery_index():
+    """
+    Category index for the landing gallery: the validated index once warmup has built it,
+    otherwise the persisted copy, so first paint never waits on Chroma.
+    """
+    if registry.is_loaded("category_index"):
+        return registry.get("category_index")
+    return registry.get("persisted_category_index")
+
+
+def get_facet_index():
+    return registry.get("facet_index")
+
+
+def get_similar_items():
+    return registry.get("similar_items")
+
+
+def get_thumbnail_cache():
+    return registry.get("thumbnail_cache")
+
+
+_warmup_lock = threading.Lock()
+_warmup_thread_lock = threading.Lock()
+_ready = threading.Event()
+_warmup_thread: Optional[threading.Thread] = None
+_warmup_state = {"stage": "idle", "error": None}
+
+# Imported up front in warmup so their cost shows up separately in the startup report
+HEAVY_IMPORTS = ["sentence_transformers", "langchain_groq"]
+
+
+def _set_stage(stage: str):
+    _warmup_state["stage"] = stage
+
+
+def warmup():
+    if _ready.is_set():
+        return
+    with _warmup_lock:
+        if _ready.is_set():
+            return
+        profiler.mark("warmup_started")
+
+        if Config.SNAPSHOT_LOAD_ON_STARTUP:
+            _set_stage("restoring snapshot")
+        ensure_snapshot_restored()
+
+        _set_stage("loading indexes")
+        # Timed before chroma_client, whose construction would otherwise pull it in unmeasured
+        with profiler.timed("import.chromadb"):
+            __import__("chromadb")
+        registry.warmup(["chroma_client", "category_index", "facet_index", "similar_items", "thumbnail_cache"])
+        # Landing-page thumbnails are built in the background while the models load
+        get_thumbnail_cache().prefetch(get_category_index().preview_image_urls())
+
+        _set_stage("importing libraries")
+        with profiler.timed("import.torch"):
+            _import_torch()
+        for module in HEAVY_IMPORTS:
+            with profiler.timed(f"import.{module}"):
+                __import__(module)
+
+        _set_stage("loading models")
+        registry.warmup(["embedding_model", "retriever"])
+
+        from telemetry import metrics, start_metrics_server
+        if metrics.enabled and Config.TELEMETRY_METRICS_PORT:
+            start_metrics_server(Config.TELEMETRY_METRICS_PORT)
+
+        _set_stage("ready")
+        profiler.mark("search_ready")
+        _ready.set()
+
+
+def _run_background_warmup():
+    try:
+        warmup()
+    except Exception as e:
+        _warmup_state["error"] = str(e)
+        _set_stage("failed")
+        print(f"❌ Background warmup failed: {e}")
+
+
+def start_background_warmup() -> Optional[threading.Thread]:
+    """
+    Starts warmup on a daemon thread once per process and returns immediately,
+    so the first page can render while models and indexes load. After a failed warmup
+    the next call starts a fresh attempt; resources that did load stay cached.
+    """
+    global _warmup_thread
+    # Not _warmup_lock: warmup() holds that for its whole run, and every rerun lands here
+    with _warmup_thread_lock:
+        if not _ready.is_set() and (_warmup_thread is None or not _warmup_thread.is_alive()):
+            _warmup_state["error"] = None
+            _warmup_thread = threading.Thread(target=_run_background_warmup, name="resource-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def is_loaded(name: str) -> bool:
+    return registry.is_loaded(name)
+
+
+def warmup_status() -> dict:
+    return {"ready": _ready.is_set(), **_warmup_state}
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    warmup()
+    print(f"✅ Resources warmed up in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    warmup()
+    print(f"✅ Second warmup (shared instances) took {(time.perf_counter() - start) * 1000:.2f}ms")
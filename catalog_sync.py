@@ -0,0 +1,202 @@
+import os
+from tqdm import tqdm
+from typing import Dict, List
+from config import Config
+from data_embedder import DataEmbedder
+from vector_db import ChromaDBClient
+from category_index import CategoryIndex
+from facet_index import FacetIndex
+from similar_items import SimilarItemsIndex
+from metadata_extractor import MetadataExtractor
+
+
+class CatalogSync:
+    def __init__(self, embedder: DataEmbedder):
+        """
+        Brings the vector store in line with the source catalog (styles.csv, images.csv and
+        the metadata JSONs) as a delta job: new products are embedded, changed ones are
+        updated in place, and products no longer in the catalog are deleted.
+        """
+        self.embedder = embedder
+        self.extractor = embedder.metadata_extractor
+        self.vector_db_client = embedder.vector_db_client
+        self.batch_size = embedder.batch_size
+        self.changes: Dict[str, List[str]] = {}
+
+    def _source_paths(self) -> Dict[str, str]:
+        # A product is in the catalog when it has a metadata JSON and a styles.csv row
+        catalog_ids = self.extractor.catalog_product_ids()
+        paths = {}
+        for metadata_path in self.embedder._get_metadata_paths():
+            product_id = os.path.splitext(os.path.basename(metadata_path))[0]
+            if product_id in catalog_ids:
+                paths[product_id] = metadata_path
+        return paths
+
+    def _flush_metadata_updates(self, ids: List[str], metadatas: List[dict]):
+        if ids:
+            self.vector_db_client.update_metadatas(ids=ids, metadatas=metadatas)
+            ids.clear()
+            metadatas.clear()
+
+    def _flush_upserts(self, batch: Dict[str, list]):
+        if batch["ids"]:
+            self.vector_db_client.upsert_to_vector_db(**batch)
+            for values in batch.values():
+                values.clear()
+
+    def sync(self, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Applies the delta and returns counts per outcome; the affected IDs are kept in
+        `self.changes`. The store is diffed in full before anything is written, so writes
+        (which can move items between partitions) never disturb the pass that finds them.
+        A dry run only diffs the store against the catalog fields: nothing is extracted with
+        the LLM, paragraphed, embedded or written.
+        """
+        source_paths = self._source_paths()
+        catalog_keys = self.extractor.catalog_field_names()
+        report = {"added": 0, "metadata_updated": 0, "reembedded": 0, "deleted": 0, "unchanged": 0, "failed": 0}
+        self.changes = {"added": [], "metadata_updated": [], "reembedded": [], "recategorized": [], "deleted": []}
+
+        pending = []  # (item_id, merged metadata, fields to clear, re-embed?)
+        stale_ids = []
+        seen_ids = set()
+
+        # 1. Diff stored products against the catalog, one page at a time; nothing is written yet
+        batches = self.vector_db_client.iter_batches(include=["metadatas"], batch_size=self.batch_size)
+        for batch in tqdm(batches, desc="🔄 Diffing stored products", unit="batch"):
+            for item_id, stored in zip(batch["ids"], batch["metadatas"]):
+                seen_ids.add(item_id)
+                metadata_path = source_paths.get(item_id)
+                if metadata_path is None:
+                    stale_ids.append(item_id)
+                    continue
+
+                try:
+                    catalog_fields = self.extractor.extract_catalog_fields(metadata_path)
+                    if catalog_fields is None:
+                        report["failed"] += 1
+                        continue
+
+                    # LLM-cleaned descriptors are kept; catalog-sourced fields are replaced wholesale,
+                    # so a field that went empty in the catalog is dropped rather than kept stale
+                    merged = {key: value for key, value in stored.items() if key not in catalog_keys}
+                    merged.update(catalog_fields)
+                    if merged == stored:
+                        report["unchanged"] += 1
+                        continue
+
+                    # Re-embed only when the text's inputs changed; LLM paragraphs aren't reproducible
+                    reembed = self.extractor.paragraph_fields(merged) != self.extractor.paragraph_fields(stored)
+                    outcome = "reembedded" if reembed else "metadata_updated"
+                    report[outcome] += 1
+                    self.changes[outcome].append(item_id)
+                    if merged.get("master_category") != stored.get("master_category"):
+                        self.changes["recategorized"].append(item_id)
+
+                    # Chroma merges metadata on write, so dropped fields must be cleared explicitly
+                    removed = {key: None for key in stored if key not in merged}
+                    pending.append((item_id, merged, removed, reembed))
+                except Exception as e:
+                    print(f"❌ Failed to sync {item_id}: {e}")
+                    report["failed"] += 1
+
+        new_ids = [product_id for product_id in source_paths if product_id not in seen_ids]
+        report["deleted"] = len(stale_ids)
+        self.changes["deleted"] = stale_ids
+        if dry_run:
+            report["added"] = len(new_ids)
+            self.changes["added"] = new_ids
+            return report
+
+        # 2. Apply the diffed updates
+        update_ids, update_metadatas = [], []
+        upserts = {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+        for item_id, merged, removed, reembed in tqdm(pending, desc="✏️ Updating products", unit="item"):
+            try:
+                if reembed:
+                    paragraph = self.extractor.convert_to_paragraph(merged)
+                    upserts["ids"].append(item_id)
+                    upserts["embeddings"].append(self.embedder.embedding_model.encode(paragraph).tolist())
+                    upserts["documents"].append(paragraph)
+                    upserts["metadatas"].append(merged)
+                if not reembed or removed:
+                    update_ids.append(item_id)
+                    update_metadatas.append({**merged, **removed})
+            except Exception as e:
+                print(f"❌ Failed to sync {item_id}: {e}")
+                report["failed"] += 1
+
+            if len(update_ids) >= self.batch_size:
+                self._flush_metadata_updates(update_ids, update_metadatas)
+            if len(upserts["ids"]) >= self.batch_size:
+                self._flush_upserts(upserts)
+
+        # 3. Embed products that are in the catalog but not yet in the store
+        for product_id in tqdm(new_ids, desc="➕ Adding new products", unit="file"):
+            try:
+                metadata = self.extractor.extract_from_file(source_paths[product_id])
+                if not metadata:
+                    report["failed"] += 1
+                    continue
+
+                paragraph = self.extractor.convert_to_paragraph(metadata)
+                upserts["ids"].append(product_id)
+                upserts["embeddings"].append(self.embedder.embedding_model.encode(paragraph).tolist())
+                upserts["documents"].append(paragraph)
+                upserts["metadatas"].append(metadata)
+                report["added"] += 1
+                self.changes["added"].append(product_id)
+            except Exception as e:
+                print(f"❌ Failed to add {product_id}: {e}")
+                report["failed"] += 1
+
+            if len(upserts["ids"]) >= self.batch_size:
+                self._flush_upserts(upserts)
+
+        # 4. Apply remaining writes and drop products removed from the catalog
+        self._flush_metadata_updates(update_ids, update_metadatas)
+        self._flush_upserts(upserts)
+        self.vector_db_client.delete_ids(stale_ids)
+
+        return report
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sync the vector store with the source catalog.")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+    args = parser.parse_args()
+
+    extractor = MetadataExtractor(Config.HTML_PROMPT, Config.PARAGRAPH_PROMPT, Config.STYLE_CSV, Config.IMAGE_CSV)
+    vector_client = ChromaDBClient(
+        collection_name=Config.VECTOR_COLLECTION_NAME,
+        persist_directory=Config.VECTOR_PERSIST_DIRECTORY
+    )
+    embedder = DataEmbedder(
+        metadata_dir=Config.METADATA_DIR,
+        metadata_extractor=extractor,
+        vector_db_client=vector_client
+    )
+
+    sync = CatalogSync(embedder)
+    report = sync.sync(dry_run=args.dry_run)
+    print("📋 Sync report:")
+    for key, value in report.items():
+        print(f"  {key}: {value}")
+
+    if args.dry_run:
+        for outcome, ids in sync.changes.items():
+            if ids:
+                preview = ", ".join(ids[:20]) + (f", … (+{len(ids) - 20})" if len(ids) > 20 else "")
+                print(f"  would be {outcome.replace('_', ' ')}: {preview}")
+
+    if not args.dry_run:
+        # Derived indexes only re-read what the sync touched; they fall back to a full build themselves
+        updated_ids = sync.changes["metadata_updated"] + sync.changes["reembedded"]
+        moved_ids = sync.changes["reembedded"] + sync.changes["recategorized"]
+        CategoryIndex().update(Config.STYLE_CSV, vector_client, changed_ids=updated_ids).save()
+        FacetIndex().update(vector_client, changed_ids=updated_ids).save()
+        SimilarItemsIndex().update(vector_client, changed_ids=moved_ids).save()
+        if Config.COMPRESSED_SEARCH_ENABLED:
+            embedder.build_compressed_index(changed_ids=sync.changes["reembedded"])
@@ -0,0 +1,173 @@
+import os
+import json
+from config import Config
+from utils import category
+from typing import Dict, Iterable, List, Optional, Set
+from vector_db import ChromaDBClient
+
+INDEX_VERSION = 1
+PREVIEW_FIELDS = ["product_id", "product_name", "brand", "price", "image_url"]
+
+
+class CategoryIndex:
+    def __init__(
+        self,
+        index_path: str = Config.CATEGORY_INDEX_PATH,
+        preview_size: int = Config.PER_CATEGORY_IMAGE
+    ):
+        """
+        Maps each (master, sub) category to its sorted product IDs and a ready-to-render
+        preview of the first few products, so the gallery never scans styles.csv per rerun.
+        """
+        self.index_path = index_path
+        self.preview_size = preview_size
+        self.fingerprint: Optional[dict] = None
+        self.categories: Dict[str, dict] = {}
+
+    @staticmethod
+    def make_key(master_category: str, sub_category: str) -> str:
+        return f"{category.clean_label(master_category)}::{category.clean_label(sub_category)}"
+
+    def compute_fingerprint(self, csv_path: str, vector_db_client: ChromaDBClient) -> dict:
+        # Serving nodes restored from a snapshot may not ship styles.csv
+        stat = os.stat(csv_path) if os.path.exists(csv_path) else None
+        return {
+            "version": INDEX_VERSION,
+            "collection": vector_db_client.collection.name,
+            "count": vector_db_client.collection.count(),
+            "csv_size": stat.st_size if stat else None,
+            "csv_mtime_ns": stat.st_mtime_ns if stat else None,
+            "preview_size": self.preview_size,
+        }
+
+    def build(self, csv_path: str, vector_db_client: ChromaDBClient) -> "CategoryIndex":
+        self.categories = self._index_categories(csv_path, vector_db_client)
+        self.fingerprint = self.compute_fingerprint(csv_path, vector_db_client)
+        return self
+
+    def update(self, csv_path: str, vector_db_client: ChromaDBClient, changed_ids: Iterable[str] = ()) -> "CategoryIndex":
+        """
+        Re-reads category membership after a sync but keeps each subcategory's preview when its
+        leading products are the same and none of them is in `changed_ids` (metadata updated),
+        so only the affected previews are fetched from the store.
+        """
+        if not self.categories and not self.load():
+            return self.build(csv_path, vector_db_client)
+
+        self.categories = self._index_categories(
+            csv_path, vector_db_client, previous=self.categories, changed_ids={str(item_id) for item_id in changed_ids}
+        )
+        self.fingerprint = self.compute_fingerprint(csv_path, vector_db_client)
+        return self
+
+    def _index_categories(
+        self,
+        csv_path: str,
+        vector_db_client: ChromaDBClient,
+        previous: Optional[Dict[str, dict]] = None,
+        changed_ids: Set[str] = frozenset()
+    ) -> Dict[str, dict]:
+        import pandas as pd
+
+        df = pd.read_csv(
+            csv_path,
+            dtype=str,
+            usecols=["product_id", "master_category", "sub_category"]
+        ).dropna()
+
+        # Only index products that are actually present in the store
+        stored_ids = set(vector_db_client.get_all_ids())
+        df = df[df["product_id"].isin(stored_ids)]
+
+        categories = {}
+        for (master, sub), group in df.groupby(["master_category", "sub_category"]):
+            key = self.make_key(master, sub)
+            product_ids = sorted(group["product_id"].unique())
+            leading = product_ids[:self.preview_size]
+            cached = (previous or {}).get(key, {})
+            if cached.get("product_ids", [])[:self.preview_size] == leading and not changed_ids.intersection(leading):
+                preview = cached["preview"]
+            else:
+                preview = [
+                    {field: metadata.get(field) for field in PREVIEW_FIELDS}
+                    for metadata in vector_db_client.get_metadatas(leading)
+                ]
+            categories[key] = {
+                "product_ids": product_ids,
+                "preview": preview,
+            }
+        return categories
+
+    def save(self):
+        payload = {"fingerprint": self.fingerprint, "categories": self.categories}
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def load(self) -> bool:
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Failed to load category index: {e}")
+            return False
+
+        self.fingerprint = payload.get("fingerprint")
+        self.categories = payload.get("categories", {})
+        return True
+
+    def is_stale(self, csv_path: str, vector_db_client: ChromaDBClient) -> bool:
+        return self.fingerprint != self.compute_fingerprint(csv_path, vector_db_client)
+
+    def load_or_build(self, csv_path: str, vector_db_client: ChromaDBClient) -> "CategoryIndex":
+        """
+        Loads the persisted index, rebuilding and saving it when the collection or CSV has changed.
+        """
+        if self.load() and not self.is_stale(csv_path, vector_db_client):
+            return self
+
+        if not os.path.exists(csv_path):
+            # Nothing to rebuild from; keep whatever was loaded (e.g. from a snapshot)
+            print(f"⚠️ {csv_path} not found, using category index as loaded")
+            return self
+
+        self.build(csv_path, vector_db_client)
+        try:
+            self.save()
+        except Exception as e:
+            print(f"⚠️ Failed to save category index: {e}")
+        return self
+
+    def invalidate(self):
+        self.fingerprint = None
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+
+    def get_product_ids(self, master_category: str, sub_category: str) -> List[str]:
+        return self.categories.get(self.make_key(master_category, sub_category), {}).get("product_ids", [])
+
+    def get_preview(self, master_category: str, sub_category: str) -> List[dict]:
+        return self.categories.get(self.make_key(master_category, sub_category), {}).get("preview", [])
+
+    def preview_image_urls(self) -> List[str]:
+        return [
+            item["image_url"]
+            for entry in self.categories.values()
+            for item in entry.get("preview", [])
+            if item.get("image_url")
+        ]
+
+
+if __name__ == "__main__":
+
+    vector_client = ChromaDBClient(
+        collection_name=Config.VECTOR_COLLECTION_NAME,
+        persist_directory=Config.VECTOR_PERSIST_DIRECTORY
+    )
+
+    index = CategoryIndex().build(Config.STYLE_CSV, vector_client)
+    index.save()
+    print(f"✅ Indexed {len(index.categories)} subcategories to {index.index_path}")
@@ -8,10 +8,19 @@ class Config:
     DATA_DIR = PROJECT_ROOT / "data"
     SAVED_ID_PATH = DATA_DIR / "saved_ids.csv"
     SAVED_DATA_PATH = DATA_DIR / "saved_data.txt"
+    SAVED_JSONL_PATH = DATA_DIR / "saved_data.jsonl"
+    SAVED_EMBEDDINGS_PATH = DATA_DIR / "saved_embeddings.npy"
+    CATEGORY_INDEX_PATH = DATA_DIR / "category_index.json"
+    FACET_INDEX_PATH = DATA_DIR / "facet_index.json"
+    EVAL_QUERIES_PATH = DATA_DIR / "eval_queries.json"
 
     # === Vector DB ===
-    VECTOR_PERSIST_DIRECTORY="chroma_store"  # Huggingface Space -> "/tmp/chroma_store"
+    VECTOR_PERSIST_DIRECTORY="chroma_store"  # Huggingface Space -> "/tmp/chroma_store" (restore with `snapshot.py load`)
     VECTOR_COLLECTION_NAME = "fashion_embeddings"
+    VECTOR_LAYOUT = "single"  # "single" or "partitioned" (one collection per master_category)
+    VECTOR_PARTITION_WORKERS = 8  # parallel partition queries when no category is known
+    SIMILAR_ITEMS_DIR = "similar_items"  # kNN graph kept next to VECTOR_PERSIST_DIRECTORY
+    COMPRESSED_INDEX_DIR = "compressed_index"  # projected codes + memory-mapped full vectors
 
     # === Metadata ===
     METADATA_DIR = DATA_DIR / "metadata"
@@ -20,15 +29,67 @@ class Config:
 
     # === Embedding ===
     EMBEDDING_MODEL_NAME = "BAAI/bge-base-en-v1.5"
+    EMBEDDING_DIM = 768  # output size of EMBEDDING_MODEL_NAME
     EMBEDDING_BATCH_SIZE = 20
 
+    # === Two-stage search ===
+    COMPRESSED_SEARCH_ENABLED = False  # scan projected codes first, then rescore with full vectors
+    COMPRESSION_METHOD = "pca"  # "pca" or "random"
+    COMPRESSION_DIMS = 192
+    COMPRESSION_QUANTIZE = True  # int8 codes (1 byte/dim) instead of float16
+    COMPRESSION_OVERSAMPLE = 8  # stage-1 candidates = top_k * oversample
+    COMPRESSION_FIT_SAMPLE = 20000
+    COMPRESSION_BLOCK_SIZE = 65536
+
     # === LLM ===
     LLM_MODEL_NAME = "llama-3.3-70b-versatile"   # "llama3-70b-8192"
+    LLM_TIMEOUT = 30.0  # seconds per attempt
+    LLM_MAX_RETRIES = 3
+    LLM_BACKOFF_BASE = 0.5
+    LLM_BACKOFF_MAX = 8.0
+    LLM_MAX_CONNECTIONS = 20
+    LLM_BREAKER_FAILURES = 5
+    LLM_BREAKER_RESET = 30.0
+    HTML_CLEANING_MODE = "local"  # "local" (LLM only when the local output looks wrong) or "llm"
+    PARAGRAPH_MODE = "llm"  # "llm" or "template" (deterministic, no external calls)
+    RERANK_TIMEOUT = 6.0
+    RERANK_DEADLINE = 10.0  # rerank falls back to vector order after this
+    RERANK_HEDGE_DELAY = 2.5  # send a duplicate rerank request if no reply by then; 0 disables
 
     # === Result ===
     TOP_K = 20
     PER_CATEGORY_IMAGE = 4
     PAGINATION_IMAGE = 8
+    FACET_SEARCH_OVERSAMPLE = 2  # margin over the candidates a price range's selectivity says the query needs
+    FACET_SEARCH_MAX_RESULTS = 1000  # cap on candidates fetched for a price range applied after the query
+    SIMILAR_ITEMS_TOP_N = 12
+    SIMILAR_ITEMS_DISPLAY = 4
+    SIMILAR_ITEMS_SAME_CATEGORY = True  # only recommend within the product's master_category
+    SIMILAR_ITEMS_BLOCK_SIZE = 1024  # rows scored per block when building the graph
+
+    # === Thumbnails ===
+    # Served by Streamlit static file serving (see .streamlit/config.toml) at app/static/...
+    IMAGE_DIR = DATA_DIR / "images"  # optional local copies of source images, named <product_id>.jpg
+    THUMBNAIL_CACHE_DIR = PROJECT_ROOT / "static" / "thumbnails"
+    THUMBNAIL_URL_PREFIX = "app/static/thumbnails"
+    THUMBNAIL_FORMAT = "JPEG"  # Streamlit static serving only sets image content types for jpg/png/gif
+    THUMBNAIL_CARD_WIDTH = 320
+    THUMBNAIL_DETAIL_WIDTH = 720
+    THUMBNAIL_MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+    # === Snapshot ===
+    SNAPSHOT_PATH = PROJECT_ROOT / "snapshots" / "fashion_snapshot.zip"
+    SNAPSHOT_READY_MARKER = DATA_DIR / "snapshot_ready.json"
+    SNAPSHOT_METADATA_PATH = DATA_DIR / "snapshot_metadata.jsonl"
+    SNAPSHOT_LOAD_ON_STARTUP = False  # install SNAPSHOT_PATH during warmup when the node isn't ready yet
+
+    # === Startup ===
+    STARTUP_MODE = "background"  # "background" (render the gallery first, load models in a thread) or "blocking"
+
+    # === Telemetry ===
+    TELEMETRY_ENABLED = False  # overridable with the TELEMETRY_ENABLED env var
+    TELEMETRY_DEBUG_PANEL = False
+    TELEMETRY_METRICS_PORT = 0  # serve /metrics for Prometheus when non-zero
 
     # === Prompt path ===
     PROMPT_DIR = PROJECT_ROOT / "prompt"
@@ -1,8 +1,12 @@
 import os
 from tqdm import tqdm
-from typing import List
+from typing import Iterable, List
 from config import Config
 from vector_db import ChromaDBClient
+from category_index import CategoryIndex
+from facet_index import FacetIndex
+from similar_items import SimilarItemsIndex
+from vector_compression import CompressedIndex
 from metadata_extractor import MetadataExtractor
 from sentence_transformers import SentenceTransformer
 
@@ -89,6 +93,16 @@ class DataEmbedder:
             except Exception as e:
                 print(f"❌ Failed to save final batch of {len(ids)} items: {e}")
 
+    def build_compressed_index(self, refit: bool = False, changed_ids: Iterable[str] = ()) -> CompressedIndex:
+        """
+        Fits the stage-1 projection and encodes the store, or with `refit=False` applies
+        additions, removals and re-embedded `changed_ids` with the existing projection.
+        """
+        index = CompressedIndex()
+        index = index.build(self.vector_db_client) if refit else index.update(self.vector_db_client, changed_ids)
+        print(f"🗜️ Compressed index covers {index.size} items")
+        return index
+
 
 if __name__ == '__main__':
 
@@ -114,3 +128,10 @@ if __name__ == '__main__':
     embedder.process_and_store()
 
     vector_client.export_all_ids_to_csv(Config.SAVED_ID_PATH)
+
+    # Refresh the gallery index so the web app picks up newly ingested products
+    CategoryIndex().build(style_csv, vector_client).save()
+    FacetIndex().build(vector_client).save()
+    SimilarItemsIndex().update(vector_client).save()
+    if Config.COMPRESSED_SEARCH_ENABLED:
+        embedder.build_compressed_index()
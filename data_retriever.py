@@ -1,14 +1,18 @@
 import os
+import math
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 from config import Config
+from typing import TYPE_CHECKING, Dict, List, Optional
 from re_ranker import ReRanker
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+from facet_index import FacetIndex, PriceRange
+from query_router import QueryRouter
+from vector_compression import CompressedIndex
 from vector_db import ChromaDBClient
-from sentence_transformers import SentenceTransformer
+from telemetry import span, traced
 
-load_dotenv()
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 
 class DataRetriever:
@@ -17,36 +21,93 @@ class DataRetriever:
         vector_db_client: ChromaDBClient,
         embedding_model_name: str = Config.EMBEDDING_MODEL_NAME,
         top_k: int = Config.TOP_K,
+        embedding_model: Optional["SentenceTransformer"] = None,
+        ranker: Optional[ReRanker] = None,
+        facet_index: Optional[FacetIndex] = None,
+        compressed_index: Optional[CompressedIndex] = None,
+        router: Optional[QueryRouter] = None,
     ):
-        self.ranker = ReRanker()
         self.vector_db_client = vector_db_client
-        self.embedding_model = SentenceTransformer(embedding_model_name)
+        self.router = router or (QueryRouter() if vector_db_client.partitioned else None)
+        self.facet_index = facet_index
+        self.compressed_index = compressed_index if compressed_index is not None and compressed_index.size else None
+        if embedding_model is None:
+            from sentence_transformers import SentenceTransformer
+            embedding_model = SentenceTransformer(embedding_model_name)
+        self.embedding_model = embedding_model
+        self.ranker = ranker or ReRanker(embedding_model=self.embedding_model)
         self.top_k = top_k
-        self.llm = self._init_llm()
 
-    def _init_llm(self):
-        return ChatGroq(
-            api_key=os.getenv("GROQ_API_KEY"),
-            model=Config.LLM_MODEL_NAME,
-            temperature=0.0,
-        )
-
-    def search(self, query: str):
-        query_embedding = self.embedding_model.encode(query).tolist()
-
-        results = self.vector_db_client.query(
-            query_embedding=query_embedding,
-            n_results=self.top_k,
-            include=["metadatas"]
-        )
+    @traced("search")
+    def search(
+        self,
+        query: str,
+        facet_filters: Optional[Dict[str, List[str]]] = None,
+        price_range: PriceRange = None,
+        selected_master: Optional[str] = None
+    ):
+        """
+        Vector search followed by LLM rerank. Facet selections are pushed into the Chroma query
+        as a metadata filter; a price range (which needs the facet index) is applied to an
+        over-sampled candidate set since prices are stored as strings. In the partitioned layout
+        the query searches the partitions for `selected_master` or the categories the query
+        mentions first, widening to all partitions when those return too few hits. Only queries
+        with no filter and no routed partition use the two-stage compressed index, which always
+        scans the whole catalog.
+        """
+        facet_filters = facet_filters or {}
+        allowed = None
+        if self.facet_index is not None and (facet_filters or price_range):
+            allowed = self.facet_index.filter(facet_filters, price_range)
+            if not allowed:
+                print("❌ No products match the selected filters.")
+                return []
+
+        with span("search.encode"):
+            query_embedding = self.embedding_model.encode(query).tolist()
+
+        partitions = self.router.route(query, selected_master) if self.router is not None else None
+        if self.compressed_index is not None and not facet_filters and not price_range and partitions is None:
+            with span("search.compressed_query"):
+                matches = self.compressed_index.search(query_embedding, self.top_k)
+                top_matches = self.vector_db_client.get_metadatas([item_id for item_id, _ in matches])
+            if not top_matches:
+                print("❌ No results found.")
+                return []
+
+            with span("search.rerank"):
+                return self.ranker.rerank_with_llm(query, top_matches)
+
+        n_results = self.top_k
+        if allowed and price_range:
+            # The where clause already applies the facets, so only the price range thins the hits
+            in_scope = self.facet_index.filter(facet_filters).bit_count()
+            expected = self.top_k * in_scope / allowed.bit_count() * Config.FACET_SEARCH_OVERSAMPLE
+            n_results = max(self.top_k, min(math.ceil(expected), in_scope, Config.FACET_SEARCH_MAX_RESULTS))
+
+        with span("search.vector_query"):
+            results = self.vector_db_client.query(
+                query_embedding=query_embedding,
+                n_results=n_results,
+                where=FacetIndex.to_where(facet_filters),
+                include=["metadatas"],
+                partitions=partitions
+            )
 
         if not results or not results["metadatas"] or not results["metadatas"][0]:
             print("❌ No results found.")
-            return
+            return []
 
         top_matches = results["metadatas"][0]
-
-        final_output = self.ranker.rerank_with_llm(query, top_matches)
+        if allowed:
+            kept = set(self.facet_index.keep_ids(allowed, [metadata.get("product_id") for metadata in top_matches]))
+            top_matches = [metadata for metadata in top_matches if metadata.get("product_id") in kept][:self.top_k]
+            if not top_matches:
+                print("❌ No results match the selected filters.")
+                return []
+
+        with span("search.rerank"):
+            final_output = self.ranker.rerank_with_llm(query, top_matches)
 
         return final_output
 
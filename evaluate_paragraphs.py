@@ -0,0 +1,109 @@
+import os
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+import json
+import argparse
+import numpy as np
+from config import Config
+from typing import Dict, List
+from vector_db import ChromaDBClient
+from paragraph_generator import TemplateParagraphGenerator
+
+
+def load_query_set(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_relevant(item_id: str, metadata: dict, judgement: dict) -> bool:
+    if item_id in set(judgement.get("relevant_ids", [])):
+        return True
+    attributes = judgement.get("relevant", {})
+    return bool(attributes) and all(
+        str(metadata.get(key, "")).strip().lower() == str(value).strip().lower()
+        for key, value in attributes.items()
+    )
+
+
+def score_rankings(scores: np.ndarray, relevance: np.ndarray, k: int) -> Dict[str, float]:
+    """
+    Recall@k, MRR@k and nDCG@k averaged over queries that have at least one relevant item.
+    `scores` and `relevance` are (num_queries, num_items).
+    """
+    recalls, reciprocal_ranks, ndcgs = [], [], []
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+
+    for query_scores, query_relevance in zip(scores, relevance):
+        total_relevant = int(query_relevance.sum())
+        if not total_relevant:
+            continue
+
+        top = np.argpartition(-query_scores, min(k, len(query_scores) - 1))[:k]
+        top = top[np.argsort(-query_scores[top])]
+        hits = query_relevance[top]
+
+        recalls.append(hits.sum() / min(total_relevant, k))
+        first_hit = np.flatnonzero(hits)
+        reciprocal_ranks.append(1.0 / (first_hit[0] + 1) if len(first_hit) else 0.0)
+        ideal = discounts[:min(total_relevant, k)].sum()
+        ndcgs.append((hits * discounts[:len(hits)]).sum() / ideal)
+
+    return {
+        f"recall@{k}": round(float(np.mean(recalls)), 4) if recalls else 0.0,
+        f"mrr@{k}": round(float(np.mean(reciprocal_ranks)), 4) if reciprocal_ranks else 0.0,
+        f"ndcg@{k}": round(float(np.mean(ndcgs)), 4) if ndcgs else 0.0,
+        "queries_scored": len(recalls),
+    }
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare retrieval quality of stored LLM-written paragraphs against template paragraphs."
+    )
+    parser.add_argument("--queries", default=str(Config.EVAL_QUERIES_PATH))
+    parser.add_argument("--top-k", type=int, default=Config.TOP_K)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    vector_client = ChromaDBClient(
+        collection_name=Config.VECTOR_COLLECTION_NAME,
+        persist_directory=Config.VECTOR_PERSIST_DIRECTORY
+    )
+    model = SentenceTransformer(Config.EMBEDDING_MODEL_NAME)
+    generator = TemplateParagraphGenerator()
+    query_set = load_query_set(args.queries)
+
+    # Stored documents/embeddings are the LLM-written baseline; template paragraphs are embedded fresh
+    ids, metadatas, llm_vectors, template_paragraphs = [], [], [], []
+    for batch in vector_client.iter_batches(include=["metadatas", "embeddings"]):
+        ids.extend(batch["ids"])
+        metadatas.extend(batch["metadatas"])
+        llm_vectors.extend(batch["embeddings"])
+        template_paragraphs.extend(generator.generate(metadata) for metadata in batch["metadatas"])
+
+    print(f"🔄 Encoding {len(template_paragraphs)} template paragraphs")
+    template_vectors = model.encode(template_paragraphs, batch_size=args.batch_size, show_progress_bar=True)
+    query_vectors = normalize(np.asarray(model.encode([q["query"] for q in query_set]), dtype=np.float32))
+
+    relevance = np.array([
+        [is_relevant(item_id, metadata, judgement) for item_id, metadata in zip(ids, metadatas)]
+        for judgement in query_set
+    ], dtype=np.float32)
+
+    report = {"items": len(ids), "queries": len(query_set)}
+    for name, vectors in (("llm", llm_vectors), ("template", template_vectors)):
+        item_vectors = normalize(np.asarray(vectors, dtype=np.float32))
+        report[name] = score_rankings(query_vectors @ item_vectors.T, relevance, args.top_k)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
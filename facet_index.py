@@ -0,0 +1,311 @@
+import os
+import json
+import math
+import numpy as np
+from config import Config
+from utils import metadata_fields
+from typing import Dict, Iterable, List, Optional, Tuple
+from vector_db import ChromaDBClient
+
+INDEX_VERSION = 1
+FULL_REBUILD_SHARE = 0.5  # an update touching more rows than this is cheaper as a full build
+PriceRange = Optional[Tuple[Optional[float], Optional[float]]]
+
+
+def _rows_to_bitmap(rows: np.ndarray, size: int) -> int:
+    mask = np.zeros(size, dtype=bool)
+    mask[rows] = True
+    return _mask_to_bitmap(mask)
+
+
+def _mask_to_bitmap(mask: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def _bitmap_to_rows(bitmap: int, size: int) -> np.ndarray:
+    if not bitmap:
+        return np.empty(0, dtype=np.int64)
+    raw = np.frombuffer(bitmap.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little")[:size])
+
+
+def _parse_price(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class FacetIndex:
+    def __init__(self, index_path: str = Config.FACET_INDEX_PATH, fields: Optional[List[str]] = None):
+        """
+        Per-value bitmaps over the stored products for the facet fields plus a price column.
+        Bit i stands for ids[i]; a filter is an OR of value bitmaps per field ANDed across fields,
+        so intersections and counts are integer operations instead of DataFrame scans.
+        """
+        self.index_path = index_path
+        self.fields = fields or [field for field, _ in metadata_fields.get_facet_fields()]
+        self.fingerprint: Optional[dict] = None
+        self.ids: List[str] = []
+        self.prices = np.empty(0, dtype=np.float64)
+        self.bitmaps: Dict[str, Dict[str, int]] = {}
+        self._row_by_id: Dict[str, int] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @property
+    def all_bitmap(self) -> int:
+        return (1 << self.size) - 1
+
+    def compute_fingerprint(self, vector_db_client: ChromaDBClient) -> dict:
+        return {
+            "version": INDEX_VERSION,
+            "collection": vector_db_client.collection.name,
+            "count": vector_db_client.collection.count(),
+            "fields": self.fields,
+        }
+
+    def build(self, vector_db_client: ChromaDBClient) -> "FacetIndex":
+        metadata_by_id = {}
+        for batch in vector_db_client.iter_batches(include=["metadatas"]):
+            metadata_by_id.update(zip(batch["ids"], batch["metadatas"]))
+
+        ids = sorted(metadata_by_id)
+        rows_by_value: Dict[str, Dict[str, List[int]]] = {field: {} for field in self.fields}
+        prices = np.full(len(ids), math.nan)
+        for row, item_id in enumerate(ids):
+            self._index_row(row, metadata_by_id[item_id], rows_by_value, prices)
+
+        self._install(ids, rows_by_value, prices, vector_db_client)
+        return self
+
+    def update(self, vector_db_client: ChromaDBClient, changed_ids: Iterable[str] = ()) -> "FacetIndex":
+        """
+        Applies a sync's delta: existing rows are remapped onto the new ID order, and only new
+        items and `changed_ids` (metadata updated) are read back from the store. Falls back to a
+        full build when most rows changed.
+        """
+        if not self.ids and not self.load():
+            return self.build(vector_db_client)
+
+        stored_ids = set(vector_db_client.get_all_ids())
+        known = set(self.ids)
+        refresh = ({str(item_id) for item_id in changed_ids} & stored_ids) | (stored_ids - known)
+        if not refresh and known == stored_ids:
+            self.fingerprint = self.compute_fingerprint(vector_db_client)
+            return self
+        if len(refresh) + len(known - stored_ids) > max(len(stored_ids), 1) * FULL_REBUILD_SHARE:
+            return self.build(vector_db_client)
+
+        # Unchanged rows move to their new position; removed and refreshed rows are dropped and re-read
+        ids = sorted(stored_ids)
+        position = {item_id: row for row, item_id in enumerate(ids)}
+        remap = np.asarray(
+            [-1 if item_id in refresh else position.get(item_id, -1) for item_id in self.ids], dtype=np.int64
+        )
+        kept = remap >= 0
+        prices = np.full(len(ids), math.nan)
+        prices[remap[kept]] = self.prices[kept]
+        rows_by_value: Dict[str, Dict[str, List[int]]] = {field: {} for field in self.fields}
+        for field in self.fields:
+            for value, bitmap in self.bitmaps.get(field, {}).items():
+                rows = remap[_bitmap_to_rows(bitmap, self.size)]
+                rows = rows[rows >= 0]
+                if len(rows):
+                    rows_by_value[field][value] = rows.tolist()
+
+        refresh = sorted(refresh)
+        for start in range(0, len(refresh), 500):
+            batch_ids = refresh[start:start + 500]
+            result = vector_db_client.collection.get(ids=batch_ids, include=["metadatas"])
+            for item_id, metadata in zip(result["ids"], result["metadatas"]):
+                self._index_row(position[item_id], metadata, rows_by_value, prices)
+
+        self._install(ids, rows_by_value, prices, vector_db_client)
+        return self
+
+    def _index_row(self, row: int, metadata: Optional[dict], rows_by_value: Dict[str, Dict[str, List[int]]], prices: np.ndarray):
+        metadata = metadata or {}
+        prices[row] = _parse_price(metadata.get("price"))
+        for field in self.fields:
+            value = str(metadata.get(field) or "").strip()
+            if value:
+                rows_by_value[field].setdefault(value, []).append(row)
+
+    def _install(self, ids: List[str], rows_by_value: Dict[str, Dict[str, List[int]]], prices: np.ndarray, vector_db_client: ChromaDBClient):
+        self.bitmaps = {
+            field: {value: _rows_to_bitmap(np.asarray(rows), len(ids)) for value, rows in sorted(values.items())}
+            for field, values in rows_by_value.items()
+        }
+        self._set_ids(ids)
+        self.prices = prices
+        self.fingerprint = self.compute_fingerprint(vector_db_client)
+
+    def _set_ids(self, ids: List[str]):
+        self.ids = ids
+        self._row_by_id = {item_id: row for row, item_id in enumerate(ids)}
+
+    def save(self):
+        payload = {
+            "fingerprint": self.fingerprint,
+            "ids": self.ids,
+            "prices": [None if math.isnan(price) else price for price in self.prices.tolist()],
+            "bitmaps": {
+                field: {value: format(bitmap, "x") for value, bitmap in values.items()}
+                for field, values in self.bitmaps.items()
+            },
+        }
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def load(self) -> bool:
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Failed to load facet index: {e}")
+            return False
+
+        self.fingerprint = payload.get("fingerprint")
+        self._set_ids(payload.get("ids", []))
+        self.prices = np.array([math.nan if price is None else price for price in payload.get("prices", [])],
+                               dtype=np.float64)
+        self.bitmaps = {
+            field: {value: int(bitmap, 16) for value, bitmap in values.items()}
+            for field, values in payload.get("bitmaps", {}).items()
+        }
+        return True
+
+    def is_stale(self, vector_db_client: ChromaDBClient) -> bool:
+        return self.fingerprint != self.compute_fingerprint(vector_db_client)
+
+    def load_or_build(self, vector_db_client: ChromaDBClient) -> "FacetIndex":
+        if self.load() and not self.is_stale(vector_db_client):
+            return self
+
+        self.build(vector_db_client)
+        try:
+            self.save()
+        except Exception as e:
+            print(f"⚠️ Failed to save facet index: {e}")
+        return self
+
+    def values(self, field: str) -> List[str]:
+        return list(self.bitmaps.get(field, {}))
+
+    def price_bounds(self) -> Tuple[float, float]:
+        known = self.prices[~np.isnan(self.prices)]
+        if not len(known):
+            return 0.0, 0.0
+        return float(known.min()), float(known.max())
+
+    def bitmap_for_ids(self, ids: Iterable[str]) -> int:
+        rows = [self._row_by_id[str(item_id)] for item_id in ids if str(item_id) in self._row_by_id]
+        return _rows_to_bitmap(np.asarray(rows, dtype=np.int64), self.size) if rows else 0
+
+    def price_bitmap(self, price_range: PriceRange) -> int:
+        if not price_range:
+            return self.all_bitmap
+        low, high = price_range
+        mask = ~np.isnan(self.prices)
+        if low is not None:
+            mask &= self.prices >= low
+        if high is not None:
+            mask &= self.prices <= high
+        return _mask_to_bitmap(mask)
+
+    def _field_bitmap(self, field: str, values: Iterable[str]) -> int:
+        bitmap = 0
+        for value in values:
+            bitmap |= self.bitmaps.get(field, {}).get(value, 0)
+        return bitmap
+
+    def filter(self, selections: Dict[str, Iterable[str]], price_range: PriceRange = None, base: Optional[int] = None) -> int:
+        """
+        Bitmap of products matching every field with a selection (any of its values) and the price range.
+        `base` restricts the result further, e.g. to the current subcategory.
+        """
+        bitmap = self.all_bitmap if base is None else base
+        for field, values in selections.items():
+            values = list(values)
+            if values:
+                bitmap &= self._field_bitmap(field, values)
+        if price_range:
+            bitmap &= self.price_bitmap(price_range)
+        return bitmap
+
+    def counts(
+        self,
+        selections: Dict[str, Iterable[str]],
+        price_range: PriceRange = None,
+        base: Optional[int] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Live count per facet value. Each field is counted under every other field's selection,
+        so choosing "Black" still shows how many "White" products the other filters leave.
+        """
+        selections = {field: list(values) for field, values in selections.items()}
+        base = self.filter({}, price_range, base)  # the price mask is shared by every field
+        counts = {}
+        for field in self.fields:
+            others = {other: values for other, values in selections.items() if other != field}
+            scope = self.filter(others, base=base)
+            counts[field] = {value: (scope & bitmap).bit_count() for value, bitmap in self.bitmaps.get(field, {}).items()}
+        return counts
+
+    def to_ids(self, bitmap: int) -> List[str]:
+        return [self.ids[row] for row in _bitmap_to_rows(bitmap, self.size)]
+
+    def contains(self, bitmap: int, product_id: str) -> bool:
+        row = self._row_by_id.get(str(product_id))
+        return row is not None and bool(bitmap >> row & 1)
+
+    def keep_ids(self, bitmap: int, ids: List[str]) -> List[str]:
+        """
+        The IDs in `bitmap`, in the order of `ids`. One intersection and one unpack per call,
+        rather than a shift of the whole bitmap per ID as with `contains`.
+        """
+        matched = set(self.to_ids(bitmap & self.bitmap_for_ids(ids)))
+        return [item_id for item_id in ids if str(item_id) in matched]
+
+    def filter_ids(self, ids: List[str], selections: Dict[str, Iterable[str]], price_range: PriceRange = None) -> List[str]:
+        """
+        Filters an ordered ID list (a subcategory or search results), keeping its order.
+        """
+        return self.keep_ids(self.filter(selections, price_range), ids)
+
+    @staticmethod
+    def to_where(selections: Dict[str, Iterable[str]]) -> Optional[dict]:
+        """
+        Chroma metadata filter for the categorical selections. Prices are stored as strings,
+        so a price range has to be applied to the query results instead.
+        """
+        clauses = [{field: {"$in": list(values)}} for field, values in selections.items() if values]
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+if __name__ == "__main__":
+    import time
+
+    vector_client = ChromaDBClient(
+        collection_name=Config.VECTOR_COLLECTION_NAME,
+        persist_directory=Config.VECTOR_PERSIST_DIRECTORY
+    )
+
+    index = FacetIndex().build(vector_client)
+    index.save()
+    print(f"✅ Indexed {index.size} products over {len(index.fields)} facets to {index.index_path}")
+
+    start = time.perf_counter()
+    counts = index.counts({"gender": ["Men"]}, price_range=(500, 2000))
+    print(f"⏱️ Facet counts in {(time.perf_counter() - start) * 1e6:.0f}µs")
+    for field, values in counts.items():
+        print(f"  {field}: {dict(sorted(values.items(), key=lambda item: -item[1])[:5])}")
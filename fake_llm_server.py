@@ -0,0 +1,165 @@
+import json
+import time
+import random
+import threading
+from typing import Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 300.0,
+        jitter_ms: float = 100.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None
+    ):
+        """
+        Local stand-in for the OpenAI-compatible chat-completions endpoint used by Groq.
+        Rerank prompts get back a subset of the products they contain; other prompts get a short paragraph.
+        Latency, 5xx errors and 429 rate limiting are injected at configurable rates.
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors_injected": 0, "rate_limited": 0}
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _draw(self):
+        with self._lock:
+            self.stats["requests"] += 1
+            roll = self._random.random()
+            delay = max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms)) / 1000.0
+            if roll < self.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return delay, 429
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats["errors_injected"] += 1
+                return delay, 500
+            return delay, 200
+
+    @staticmethod
+    def _completion_text(prompt: str) -> str:
+        # Rerank prompt: echo back roughly the first half of the candidate products
+        _, marker, products = prompt.rpartition("Products:\n")
+        if marker:
+            try:
+                items = json.loads(products)
+                if isinstance(items, list):
+                    return json.dumps(items[:max(1, len(items) // 2)] if items else [], ensure_ascii=False)
+            except json.JSONDecodeError:
+                return "[]"
+        return "A versatile everyday product with a clean design, suitable for casual wear."
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+
+                delay, status = server._draw()
+                time.sleep(delay)
+
+                if status == 429:
+                    self._send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                                    headers={"Retry-After": f"{server.retry_after:g}"})
+                    return
+                if status != 200:
+                    self._send_json(status, {"error": {"message": "Injected failure", "type": "server_error"}})
+                    return
+
+                messages = request.get("messages", [])
+                prompt = messages[-1].get("content", "") if messages else ""
+                content = server._completion_text(prompt)
+                prompt_tokens = max(1, len(prompt) // 4)
+                completion_tokens = max(1, len(content) // 4)
+
+                self._send_json(200, {
+                    "id": f"chatcmpl-fake-{int(time.time() * 1000)}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                })
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a fake chat-completions server.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeLLMServer(
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate
+    ).start()
+    print(f"✅ Fake LLM server listening on {fake.base_url} (set GROQ_BASE_URL to this)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,284 @@
+import os
+import time
+import random
+import threading
+from config import Config
+from dotenv import load_dotenv
+from typing import Optional
+from email.utils import parsedate_to_datetime
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from telemetry import metrics
+
+load_dotenv()
+
+metrics.describe("llm_retries_total", "LLM calls retried after a 429, 5xx, timeout or connection error.")
+metrics.describe("llm_hedged_total", "LLM calls for which a hedged duplicate request was sent.")
+metrics.describe("llm_circuit_rejections_total", "LLM calls rejected immediately because the circuit was open.")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = Config.LLM_BREAKER_FAILURES, reset_timeout: float = Config.LLM_BREAKER_RESET):
+        """
+        Opens after `failure_threshold` consecutive provider failures and rejects calls until
+        `reset_timeout` has passed, then lets a single trial call through (half-open).
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None)
+
+
+def _is_transient(error: Exception) -> bool:
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    # Timeouts and connection resets carry no status code
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class LLMClient:
+    def __init__(
+        self,
+        model_name: str = Config.LLM_MODEL_NAME,
+        temperature: float = 0.0,
+        timeout: float = Config.LLM_TIMEOUT,
+        max_retries: int = Config.LLM_MAX_RETRIES,
+        backoff_base: float = Config.LLM_BACKOFF_BASE,
+        backoff_max: float = Config.LLM_BACKOFF_MAX,
+        max_connections: int = Config.LLM_MAX_CONNECTIONS,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        """
+        Shared chat client with a pooled keep-alive HTTP connection, per-call timeouts,
+        jittered retries on 429/5xx that honour Retry-After, optional hedging and a circuit breaker.
+        The underlying ChatGroq is created on first use so importing modules works offline.
+        """
+        self.model_name = model_name
+        self.temperature = temperature
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_connections = max_connections
+        self.breaker = breaker or CircuitBreaker()
+
+        self._chat_model = None
+        self._init_lock = threading.Lock()
+        self._hedge_executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="llm-hedge")
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+    def _get_chat_model(self):
+        if self._chat_model is None:
+            with self._init_lock:
+                if self._chat_model is None:
+                    import httpx
+                    from langchain_groq import ChatGroq
+
+                    http_client = httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_connections,
+                            keepalive_expiry=60.0
+                        ),
+                        timeout=self.timeout
+                    )
+                    self._chat_model = ChatGroq(
+                        api_key=os.getenv("GROQ_API_KEY"),
+                        model=self.model_name,
+                        temperature=self.temperature,
+                        timeout=self.timeout,
+                        max_retries=0,  # Retries are handled here so they respect the call deadline
+                        http_client=http_client,
+                    )
+        return self._chat_model
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _invoke_with_retries(self, prompt: str, timeout: float, deadline: float,
+                             cancelled: Optional[threading.Event] = None):
+        cancelled = cancelled or threading.Event()
+        attempt = 0
+        while True:
+            # A queued or retrying attempt whose caller has given up must not reach the provider
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or cancelled.is_set():
+                raise TimeoutError("LLM call exceeded its deadline")
+            try:
+                return self._get_chat_model().invoke(prompt, timeout=min(timeout, remaining))
+            except Exception as e:
+                if not _is_transient(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                metrics.inc("llm_retries_total", labels={"status": str(_status_code(e) or type(e).__name__)})
+                if cancelled.wait(delay):
+                    raise TimeoutError("LLM call was cancelled")
+                attempt += 1
+
+    def _submit(self, *args) -> Optional[Future]:
+        """
+        Runs an attempt on the hedge pool, or returns None when every worker is busy, so a
+        hedge never queues behind other calls and starts after its caller has given up.
+        """
+        with self._in_flight_lock:
+            if self._in_flight >= self.max_connections:
+                return None
+            self._in_flight += 1
+        future = self._hedge_executor.submit(self._invoke_with_retries, *args)
+        future.add_done_callback(self._release_worker)
+        return future
+
+    def _release_worker(self, _future: Future):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+
+    def _invoke_hedged(self, prompt: str, timeout: float, deadline: float, hedge_delay: float):
+        cancelled = threading.Event()
+        primary = self._submit(prompt, timeout, deadline, cancelled)
+        if primary is None:
+            return self._invoke_with_retries(prompt, timeout, deadline)
+
+        pending = {primary}
+        try:
+            done, _ = wait(pending, timeout=hedge_delay)
+            if not done:
+                hedge = self._submit(prompt, timeout, deadline, cancelled)
+                if hedge is not None:
+                    metrics.inc("llm_hedged_total")
+                    pending.add(hedge)
+
+            last_error = None
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    last_error = future.exception()
+            raise last_error or TimeoutError("LLM call exceeded its deadline")
+        finally:
+            # The losing attempt stops before its next request; a queued one never starts
+            cancelled.set()
+            for future in pending:
+                future.cancel()
+
+    def invoke(
+        self,
+        prompt: str,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        hedge_delay: Optional[float] = None
+    ):
+        """
+        Invokes the model. `timeout` bounds each attempt, `deadline` bounds the whole call
+        including retries, and `hedge_delay` sends a duplicate request if no reply arrives in time.
+        Raises CircuitOpenError without calling the provider while the circuit is open.
+        """
+        if not self.breaker.allow():
+            metrics.inc("llm_circuit_rejections_total")
+            raise CircuitOpenError("LLM provider circuit is open")
+
+        timeout = timeout or self.timeout
+        call_deadline = time.monotonic() + (deadline or timeout * (self.max_retries + 1))
+        try:
+            if hedge_delay:
+                response = self._invoke_hedged(prompt, timeout, call_deadline, hedge_delay)
+            else:
+                response = self._invoke_with_retries(prompt, timeout, call_deadline)
+        except Exception as e:
+            if _is_transient(e) or isinstance(e, TimeoutError):
+                self.breaker.record_failure()
+            else:
+                # Client-side errors say nothing about provider health
+                self.breaker.record_success()
+            raise
+
+        self.breaker.record_success()
+        return response
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """
+    Process-wide LLM client shared by ingest, rerank and retrieval.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
@@ -0,0 +1,217 @@
+import os
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+import json
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+import numpy as np
+from config import Config
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from fake_llm_server import FakeLLMServer
+
+COLOURS = ["black", "white", "blue", "red", "green", "grey", "navy blue", "brown", "pink", "beige"]
+PRODUCTS = ["tshirts", "shoes", "jeans", "backpacks", "watches", "sandals", "kurtas", "dresses", "caps", "sunglasses"]
+OCCASIONS = ["for summer", "for office", "for running", "for a party", "for winter", "for casual outings", ""]
+CATEGORIES = {
+    "Apparel": ["Topwear", "Bottomwear", "Dress", "Innerwear"],
+    "Footwear": ["Shoes", "Sandal", "Flip Flops"],
+    "Accessories": ["Bags", "Watches", "Eyewear", "Headwear"],
+}
+
+
+class HashingEncoder:
+    def __init__(self, dim: int):
+        """
+        Deterministic stand-in for the sentence encoder, so runs can isolate retrieval and rerank cost.
+        """
+        self.dim = dim
+
+    def encode(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+def generate_queries(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(filter(None, ["suggest me some", rng.choice(COLOURS), rng.choice(PRODUCTS), rng.choice(OCCASIONS)]))
+        for _ in range(count)
+    ]
+
+
+def load_queries(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def build_synthetic_collection(persist_directory: str, size: int, dim: int, seed: int = 0, batch_size: int = 1000):
+    from vector_db import ChromaDBClient
+
+    client = ChromaDBClient(collection_name="load_test", persist_directory=persist_directory)
+    if client.collection.count() >= size:
+        return client
+
+    rng = np.random.default_rng(seed)
+    masters = list(CATEGORIES)
+    for start in range(client.collection.count(), size, batch_size):
+        end = min(start + batch_size, size)
+        vectors = rng.standard_normal((end - start, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        ids, documents, metadatas = [], [], []
+        for i in range(start, end):
+            master = masters[i % len(masters)]
+            sub = CATEGORIES[master][i % len(CATEGORIES[master])]
+            colour = COLOURS[i % len(COLOURS)].title()
+            ids.append(str(100000 + i))
+            documents.append(f"A {colour} {sub} item from the {master} range.")
+            metadatas.append({
+                "product_id": str(100000 + i),
+                "product_name": f"Synthetic {colour} {sub} {i}",
+                "brand": f"Brand {i % 50}",
+                "price": str(199 + (i * 37) % 5000),
+                "master_category": master,
+                "sub_category": sub,
+                "base_colour": colour,
+                "gender": ["Men", "Women", "Unisex"][i % 3],
+                "season": ["Summer", "Winter", "Fall", "Spring"][i % 4],
+                "usage": ["Casual", "Formal", "Sports"][i % 3],
+            })
+
+        client.add_to_vector_db(ids=ids, embeddings=vectors.tolist(), documents=documents, metadatas=metadatas)
+    return client
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class LoadTester:
+    def __init__(self, retriever, queries: List[str], concurrency: int):
+        self.retriever = retriever
+        self.queries = queries
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._next = 0
+        self.latencies: List[float] = []
+        self.errors: dict = {}
+
+    def _next_query(self, total: int) -> Optional[str]:
+        with self._lock:
+            if self._next >= total:
+                return None
+            query = self.queries[self._next % len(self.queries)]
+            self._next += 1
+            return query
+
+    def _worker(self, total: int, deadline: Optional[float]):
+        while deadline is None or time.perf_counter() < deadline:
+            query = self._next_query(total)
+            if query is None:
+                return
+            start = time.perf_counter()
+            try:
+                self.retriever.search(query)
+                with self._lock:
+                    self.latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                with self._lock:
+                    name = type(e).__name__
+                    self.errors[name] = self.errors.get(name, 0) + 1
+
+    def run(self, total: int, duration: Optional[float] = None) -> dict:
+        deadline = time.perf_counter() + duration if duration else None
+        total = total if not duration else float("inf")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for _ in range(self.concurrency):
+                executor.submit(self._worker, total, deadline)
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(self.latencies)
+        error_count = sum(self.errors.values())
+        completed = len(latencies) + error_count
+        return {
+            "requests": completed,
+            "succeeded": len(latencies),
+            "errors": self.errors,
+            "error_rate": round(error_count / completed, 4) if completed else 0.0,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_qps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 2),
+                "p90": round(percentile(latencies, 90) * 1000, 2),
+                "p99": round(percentile(latencies, 99) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+                "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+            },
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test DataRetriever.search against a fake LLM and synthetic store.")
+    parser.add_argument("--queries", help="Query log to replay, one query per line (default: generated mix)")
+    parser.add_argument("--generate", type=int, default=200, help="Number of generated queries when no log is given")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead of a fixed request count")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--collection-size", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--persist-directory", help="Reuse a synthetic store across runs (default: temp dir)")
+    parser.add_argument("--real-encoder", action="store_true", help=f"Encode with {Config.EMBEDDING_MODEL_NAME}")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    fake_llm = FakeLLMServer(
+        latency_ms=args.llm_latency_ms,
+        jitter_ms=args.llm_jitter_ms,
+        error_rate=args.llm_error_rate,
+        rate_limit_rate=args.llm_rate_limit_rate,
+        seed=0
+    ).start()
+
+    # The Groq SDK reads these when the client is created, so set them before any imports build one
+    os.environ["GROQ_BASE_URL"] = fake_llm.base_url
+    os.environ["GROQ_API_BASE"] = fake_llm.base_url
+    os.environ.setdefault("GROQ_API_KEY", "load-test")
+
+    from data_retriever import DataRetriever
+
+    persist_directory = args.persist_directory or tempfile.mkdtemp(prefix="load_test_chroma_")
+    print(f"🔧 Building synthetic collection of {args.collection_size} items in {persist_directory}")
+    vector_client = build_synthetic_collection(persist_directory, args.collection_size, args.dim)
+
+    if args.real_encoder:
+        from sentence_transformers import SentenceTransformer
+        encoder = SentenceTransformer(Config.EMBEDDING_MODEL_NAME)
+    else:
+        encoder = HashingEncoder(args.dim)
+
+    retriever = DataRetriever(vector_db_client=vector_client, embedding_model=encoder)
+    queries = load_queries(args.queries) if args.queries else generate_queries(args.generate)
+
+    print(f"🚀 Running {'%.0fs' % args.duration if args.duration else args.requests} "
+          f"against {len(queries)} queries at concurrency {args.concurrency}")
+    report = LoadTester(retriever, queries, args.concurrency).run(args.requests, args.duration)
+    report["fake_llm"] = dict(fake_llm.stats)
+    report["config"] = {k: v for k, v in vars(args).items() if k != "output"}
+    fake_llm.stop()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -2,27 +2,40 @@ import os
 import json
 import pandas as pd
 from config import Config
-from dotenv import load_dotenv
-from typing import Dict, Optional
-from langchain_groq import ChatGroq
+from typing import Dict, Optional, Set
+from llm_client import get_llm_client
+from utils import html_cleaner
+from paragraph_generator import TemplateParagraphGenerator
+from telemetry import metrics, record_llm_usage, span
 
-load_dotenv()
+# Metadata that never reaches the paragraph an item is embedded from
+PARAGRAPH_IGNORED_FIELDS = ["product_id", "image_url"]
 
 
 class MetadataExtractor:
-    def __init__(self, html_prompt_path: str, paragraph_prompt_path: str, style_csv_path: str, images_csv_path: str):
+    def __init__(
+        self,
+        html_prompt_path: str,
+        paragraph_prompt_path: str,
+        style_csv_path: str,
+        images_csv_path: str,
+        html_cleaning_mode: str = Config.HTML_CLEANING_MODE,
+        paragraph_mode: str = Config.PARAGRAPH_MODE
+    ):
         self.llm = self._init_llm()
+        self.html_cleaning_mode = html_cleaning_mode
+        self.paragraph_mode = paragraph_mode
+        self.paragraph_generator = TemplateParagraphGenerator()
         self.html_prompt_template = self._load_prompt(html_prompt_path)
         self.paragraph_prompt_template = self._load_prompt(paragraph_prompt_path)
         self.images_df = self._load_csv(images_csv_path)
         self.style_df = self._load_csv(style_csv_path)
+        # Keyed views so per-product lookups don't scan the whole CSV
+        self._style_by_id = self.style_df.drop_duplicates("product_id").set_index("product_id", drop=False)
+        self._image_by_name = self.images_df.drop_duplicates("file_name").set_index("file_name")
 
     def _init_llm(self):
-        return ChatGroq(
-            api_key=os.getenv("GROQ_API_KEY"),
-            model=Config.LLM_MODEL_NAME,
-            temperature=0.0,
-        )
+        return get_llm_client()
 
     def _load_prompt(self, path: str) -> str:
         if not os.path.exists(path):
@@ -43,47 +56,126 @@ class MetadataExtractor:
         prompt = self.html_prompt_template.format(html_text=html_content)
 
         try:
-            response = self.llm.invoke(prompt)
+            with span("ingest.clean_html_llm"):
+                response = self.llm.invoke(prompt)
+            record_llm_usage(response, "clean_html")
             return response.content.strip()
         except Exception as e:
             print(f"⚠️ Failed to clean HTML: {e}")
             raise e  # 🚨 Re-raise to allow outer loop to break
 
+    def _clean_html(self, html_content: str) -> str:
+        """
+        Cleans descriptor HTML locally, calling the LLM only when the local output looks wrong.
+        If that fallback fails (e.g. offline ingest), the local output is kept.
+        """
+        if self.html_cleaning_mode == "llm":
+            return self._clean_html_with_llm(html_content)
+
+        cleaned = html_cleaner.clean_html(html_content)
+        if not html_cleaner.needs_llm_cleanup(cleaned, html_content):
+            metrics.inc("html_clean_total", labels={"path": "local"})
+            return cleaned
+
+        try:
+            llm_cleaned = self._clean_html_with_llm(html_content)
+            metrics.inc("html_clean_total", labels={"path": "llm_fallback"})
+            return llm_cleaned
+        except Exception:
+            metrics.inc("html_clean_total", labels={"path": "llm_fallback_failed"})
+            return cleaned
+
     def _lookup_csv_metadata(self, product_id: int) -> Dict[str, str]:
-        row = self.style_df[self.style_df["product_id"] == product_id]
-        if row.empty:
+        if product_id not in self._style_by_id.index:
             return {}
-        return row.iloc[0].to_dict()
+        return self._style_by_id.loc[product_id].to_dict()
 
     def _lookup_image_url(self, product_id: int) -> Optional[str]:
         filename = f"{product_id}.jpg"
-        row = self.images_df[self.images_df["file_name"] == filename]
-        if not row.empty:
-            return row.iloc[0]["link"]
+        if filename in self._image_by_name.index:
+            return self._image_by_name.loc[filename, "link"]
         return None
 
+    def _load_json(self, json_path: str) -> Optional[dict]:
+        if not os.path.exists(json_path):
+            print(f"❌ File not found: {json_path}")
+            return None
+
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"❌ JSON loading error: {e}")
+            return None
+
+    def _merge_catalog_fields(self, metadata: Dict[str, str], product_id: int) -> Dict[str, str]:
+        # Merge CSV attributes
+        for key, value in self._lookup_csv_metadata(product_id).items():
+            if key not in metadata and pd.notna(value):
+                metadata[key] = str(value)
+
+        # Add image URL if available
+        image_url = self._lookup_image_url(product_id)
+        if image_url:
+            metadata["image_url"] = image_url
+
+        return metadata
+
+    def catalog_field_names(self) -> Set[str]:
+        # Every key extract_catalog_fields can produce; the rest are LLM-cleaned descriptors
+        return {"brand", "price", "image_url", *map(str, self.style_df.columns)}
+
+    def catalog_product_ids(self) -> Set[str]:
+        return {str(product_id) for product_id in self._style_by_id.index}
+
+    def extract_catalog_fields(self, json_path: str) -> Optional[Dict[str, str]]:
+        """
+        Extracts the fields that come straight from the catalog (brand, price, styles.csv and
+        images.csv attributes) without the LLM-cleaned HTML descriptors.
+        """
+        raw_json = self._load_json(json_path)
+        if raw_json is None:
+            return None
+
+        data = raw_json.get("data", {})
+        product_id = int(data.get("id", 0))
+        metadata = {
+            "brand": data.get("brandName", ""),
+            "price": str(data.get("price", 0)),
+        }
+        return self._merge_catalog_fields(metadata, product_id)
+
     def convert_to_paragraph(self, metadata: dict) -> str:
-        ignore_keys = ["product_id", "image_url"]
-        label_string = ". ".join(f"{k}: {v}" for k, v in metadata.items() if k not in ignore_keys and v)
+        if self.paragraph_mode == "template":
+            return self.paragraph_generator.generate(metadata)
+        return self._convert_to_paragraph_with_llm(metadata)
+
+    def paragraph_fields(self, metadata: dict) -> Dict[str, str]:
+        """
+        The non-empty fields convert_to_paragraph reads in the current mode. Two metadata dicts
+        with equal paragraph fields embed the same text, whatever the LLM would word it as.
+        """
+        if self.paragraph_mode == "template":
+            fields = set(self.paragraph_generator.field_order)
+            return {k: v for k, v in metadata.items() if k in fields and v}
+        return {k: v for k, v in metadata.items() if k not in PARAGRAPH_IGNORED_FIELDS and v}
+
+    def _convert_to_paragraph_with_llm(self, metadata: dict) -> str:
+        label_string = ". ".join(f"{k}: {v}" for k, v in metadata.items() if k not in PARAGRAPH_IGNORED_FIELDS and v)
         prompt = self.paragraph_prompt_template.format(label_string=label_string)
 
         try:
-            response = self.llm.invoke(prompt)
+            with span("ingest.paragraph_llm"):
+                response = self.llm.invoke(prompt)
+            record_llm_usage(response, "paragraph")
             return response.content.strip()
         except Exception as e:
             print(f"❌ LLM invocation failed: {e}")
             raise e  # 🚨 Let the outer process_and_store() handle it
 
     def extract_from_file(self, json_path: str) -> Optional[Dict[str, str]]:
-        if not os.path.exists(json_path):
-            print(f"❌ File not found: {json_path}")
-            return None
-
-        try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                raw_json = json.load(f)
-        except Exception as e:
-            print(f"❌ JSON loading error: {e}")
+        raw_json = self._load_json(json_path)
+        if raw_json is None:
             return None
 
         try:
@@ -93,9 +185,9 @@ class MetadataExtractor:
             product_id = int(data.get("id", 0))
             brand = data.get("brandName", "")
 
-            description_paragraph = self._clean_html_with_llm(descriptors.get("description", {}).get("value", ""))
-            style_note_paragraph = self._clean_html_with_llm(descriptors.get("style_note", {}).get("value", ""))
-            materials_care_paragraph = self._clean_html_with_llm(descriptors.get("materials_care_desc", {}).get("value", ""))
+            description_paragraph = self._clean_html(descriptors.get("description", {}).get("value", ""))
+            style_note_paragraph = self._clean_html(descriptors.get("style_note", {}).get("value", ""))
+            materials_care_paragraph = self._clean_html(descriptors.get("materials_care_desc", {}).get("value", ""))
 
             # Final cleaned metadata
             cleaned_metadata = {
@@ -106,20 +198,8 @@ class MetadataExtractor:
                 "price": str(data.get("price", 0)),
             }
 
-            # Lookup from CSV
-            csv_data = self._lookup_csv_metadata(product_id)
-
-            # Merge CSV attributes
-            for key, value in csv_data.items():
-                if key not in cleaned_metadata and pd.notna(value):
-                    cleaned_metadata[key] = str(value)
-
-            # Add image URL if available
-            image_url = self._lookup_image_url(product_id)
-            if image_url:
-                cleaned_metadata["image_url"] = image_url
-
-            return cleaned_metadata
+            # Lookup from CSV and images
+            return self._merge_catalog_fields(cleaned_metadata, product_id)
 
         except Exception as e:
             print(f"❌ Metadata extraction error from {json_path}: {e}")
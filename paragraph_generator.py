@@ -0,0 +1,137 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from utils import metadata_fields
+
+MISSING_VALUES = {"", "na", "nan", "none", "null"}
+
+GENDER_PHRASES = {
+    "men": "men",
+    "women": "women",
+    "boys": "boys",
+    "girls": "girls",
+    "unisex": "men and women",
+}
+
+# Category-specific wording; keys are master_category values from styles.csv
+CATEGORY_PHRASING = {
+    "Apparel": {"article": "a", "noun": "garment", "usage": "Made for {usage} wear"},
+    "Footwear": {"article": "", "noun": "footwear", "usage": "Built for {usage} use"},
+    "Accessories": {"article": "a", "noun": "accessory", "usage": "Suited to {usage} styling"},
+    "Personal Care": {"article": "a", "noun": "personal care product", "usage": "Intended for {usage} use"},
+    "Sporting Goods": {"article": "a", "noun": "piece of sports equipment", "usage": "Designed for {usage} activities"},
+}
+DEFAULT_PHRASING = {"article": "a", "noun": "product", "usage": "Intended for {usage} use"}
+
+
+def _value(metadata: dict, key: str) -> Optional[str]:
+    value = metadata.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return None if value.lower() in MISSING_VALUES else value
+
+
+def _sentence(text: str) -> str:
+    text = text.strip()
+    if not text:
+        return ""
+    text = text[0].upper() + text[1:]
+    return text if text[-1] in ".!?" else text + "."
+
+
+class TemplateParagraphGenerator:
+    def __init__(self, field_order: Optional[List[str]] = None):
+        """
+        Deterministic, LLM-free alternative to MetadataExtractor.convert_to_paragraph.
+        Sentences are emitted in the order their fields appear in `field_order`,
+        with wording chosen by master_category.
+        """
+        self.field_order = field_order or metadata_fields.get_paragraph_template_fields()
+        self.sentences: List[Tuple[Tuple[str, ...], Callable[[dict, dict], Optional[str]]]] = [
+            (("product_name", "brand", "gender", "base_colour"), self._identity_sentence),
+            (("product_type", "master_category", "sub_category"), self._category_sentence),
+            (("usage", "season", "year"), self._occasion_sentence),
+            (("price",), self._price_sentence),
+            (("description",), lambda m, p: _value(m, "description")),
+            (("style_note",), lambda m, p: _value(m, "style_note")),
+            (("materials_care",), lambda m, p: _value(m, "materials_care")),
+        ]
+
+    def _identity_sentence(self, metadata: dict, phrasing: dict) -> Optional[str]:
+        name = _value(metadata, "product_name")
+        colour = _value(metadata, "base_colour")
+        brand = _value(metadata, "brand")
+        gender = _value(metadata, "gender")
+
+        noun = " ".join(filter(None, [phrasing["article"], colour.lower() if colour else None, phrasing["noun"]]))
+        text = f"The {name} is {noun}" if name else f"This is {noun}"
+        if gender:
+            text += f" for {GENDER_PHRASES.get(gender.lower(), gender.lower())}"
+        if brand:
+            text += f" from {brand}"
+        return text
+
+    def _category_sentence(self, metadata: dict, phrasing: dict) -> Optional[str]:
+        product_type = _value(metadata, "product_type")
+        path = [value for value in (_value(metadata, "master_category"), _value(metadata, "sub_category")) if value]
+        if len(path) == 2 and path[0] == path[1]:
+            path = path[:1]
+
+        location = ", in the ".join(path) + (" section" if len(path) == 2 else "")
+        if product_type and location:
+            return f"It is listed as {product_type.lower()} under {location}"
+        if product_type:
+            return f"It is listed as {product_type.lower()}"
+        return f"It is listed under {location}" if location else None
+
+    def _occasion_sentence(self, metadata: dict, phrasing: dict) -> Optional[str]:
+        usage = _value(metadata, "usage")
+        season = _value(metadata, "season")
+        year = _value(metadata, "year")
+
+        parts = []
+        if usage:
+            parts.append(phrasing["usage"].format(usage=usage.lower()))
+        if season:
+            parts.append(f"{'and ' if parts else 'Made for '}the {season.lower()} season")
+        text = " ".join(parts)
+        if year:
+            year = year.split(".")[0]  # years can come through as floats from styles.csv
+            text = f"{text}, from the {year} collection" if text else f"It is from the {year} collection"
+        return text or None
+
+    def _price_sentence(self, metadata: dict, phrasing: dict) -> Optional[str]:
+        price = _value(metadata, "price")
+        return f"It is priced at {price}" if price and price != "0" else None
+
+    def _sentence_order(self) -> List[Tuple[Tuple[str, ...], Callable]]:
+        rank = {field: i for i, field in enumerate(self.field_order)}
+        selected = [entry for entry in self.sentences if any(field in rank for field in entry[0])]
+        return sorted(selected, key=lambda entry: min(rank[f] for f in entry[0] if f in rank))
+
+    def generate(self, metadata: Dict[str, str]) -> str:
+        phrasing = CATEGORY_PHRASING.get(_value(metadata, "master_category") or "", DEFAULT_PHRASING)
+        fields = set(self.field_order)
+
+        # Fields left out of `field_order` are hidden from the builders
+        visible = {key: value for key, value in metadata.items() if key in fields}
+        sentences = [_sentence(builder(visible, phrasing) or "") for _, builder in self._sentence_order()]
+        return " ".join(sentence for sentence in sentences if sentence)
+
+
+if __name__ == "__main__":
+    sample = {
+        "brand": "Puma",
+        "description": "A football for soccer games in all weather conditions.",
+        "price": "999",
+        "product_id": "1550",
+        "gender": "Unisex",
+        "master_category": "Sporting Goods",
+        "sub_category": "Sports Equipment",
+        "product_type": "Footballs",
+        "base_colour": "White",
+        "season": "Fall",
+        "year": "2010.0",
+        "usage": "Sports",
+        "product_name": "Puma Cat Trainer-WBL Football",
+    }
+    print(TemplateParagraphGenerator().generate(sample))
@@ -0,0 +1,74 @@
+import re
+from utils import category
+from typing import Dict, List, Optional
+
+# Query words that point at a master category beyond its own subcategory names
+CATEGORY_KEYWORDS = {
+    "Footwear": [
+        "shoe", "shoes", "sneaker", "sneakers", "boot", "boots", "sandal", "sandals", "slipper", "slippers",
+        "flip flop", "flip flops", "heels", "loafers", "footwear", "trainers",
+    ],
+    "Apparel": [
+        "shirt", "shirts", "tshirt", "tshirts", "t-shirt", "t-shirts", "tops", "jeans", "trousers", "pants",
+        "shorts", "skirt", "skirts", "dress", "dresses", "kurta", "kurtas", "saree", "sarees", "jacket", "jackets",
+        "sweater", "sweatshirt", "hoodie", "tracksuit", "track pants", "leggings", "innerwear", "nightwear",
+    ],
+    "Accessories": [
+        "bag", "bags", "backpack", "backpacks", "handbag", "handbags", "wallet", "wallets", "belt", "belts",
+        "watches", "sunglasses", "eyewear", "hat", "hats", "necktie", "neckties", "jewellery",
+        "jewelry", "earrings", "necklace", "bracelet", "scarf", "scarves", "socks", "umbrella", "cufflinks",
+    ],
+    "Personal Care": [
+        "perfume", "perfumes", "deodorant", "fragrance", "lipstick", "lip balm", "makeup", "nail polish",
+        "skincare", "skin care", "moisturiser", "moisturizer", "shampoo", "kajal", "eyeliner", "mascara",
+    ],
+    "Sporting Goods": [
+        "football", "footballs", "basketball", "basketballs", "racquet", "racket",
+        "wristband", "wristbands", "sports equipment",
+    ],
+}
+
+# Words too common outside their category to route on ("ball gown", "tie dye", "watch out"),
+# whether listed above or coming from a subcategory name
+AMBIGUOUS_WORDS = {
+    "ball", "balls", "cap", "caps", "tie", "ties", "watch", "nail", "nails",
+    "eyes", "hair", "lips", "skin", "accessories",
+}
+
+
+class QueryRouter:
+    def __init__(self, keywords: Optional[Dict[str, List[str]]] = None):
+        """
+        Picks the master categories a query is about, so a partitioned store can search those
+        collections first. Returns None when the query names no category (search everything).
+        A routed search that comes back short is widened to every partition by the store.
+        """
+        keywords = {master: list(words) for master, words in (keywords or CATEGORY_KEYWORDS).items()}
+        # Subcategory names from the browse tree count as keywords for their master category
+        for master_with_icon, sub_dict in category.get_category_tree().items():
+            master = category.clean_label(master_with_icon)
+            keywords.setdefault(master, []).extend(sub.lower() for sub in sub_dict if sub.lower() != master.lower())
+
+        self.patterns = {
+            master: re.compile(r"\b(?:" + "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True)) + r")\b")
+            for master, words in ((master, set(words) - AMBIGUOUS_WORDS) for master, words in keywords.items())
+            if words
+        }
+
+    def analyze(self, query: str) -> List[str]:
+        text = query.lower()
+        return [master for master, pattern in self.patterns.items() if pattern.search(text)]
+
+    def route(self, query: str, selected_master: Optional[str] = None) -> Optional[List[str]]:
+        """
+        An explicit UI selection wins; otherwise the categories the query mentions, if any.
+        """
+        if selected_master:
+            return [category.clean_label(selected_master)]
+        return self.analyze(query) or None
+
+
+if __name__ == "__main__":
+    router = QueryRouter()
+    for query in ["suggest me some black shoes", "suggest me some backpacks and white shoes", "a ball gown for a party"]:
+        print(f"{query!r} -> {router.route(query)}")
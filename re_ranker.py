@@ -2,13 +2,13 @@ import os
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 import json
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 from config import Config
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from sentence_transformers import SentenceTransformer
+from llm_client import get_llm_client
+from telemetry import metrics, record_llm_usage, span
 
-load_dotenv()
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 
 class ReRanker:
@@ -16,19 +16,19 @@ class ReRanker:
         self,
         embedding_model_name: str = Config.EMBEDDING_MODEL_NAME,
         top_k: int = Config.TOP_K,
-        prompt_path: str = Config.RERANK_PROMPT
+        prompt_path: str = Config.RERANK_PROMPT,
+        embedding_model: Optional["SentenceTransformer"] = None
     ):
-        self.embedding_model = SentenceTransformer(embedding_model_name)
+        if embedding_model is None:
+            from sentence_transformers import SentenceTransformer
+            embedding_model = SentenceTransformer(embedding_model_name)
+        self.embedding_model = embedding_model
         self.top_k = top_k
         self.prompt_template = self._load_prompt(prompt_path)
         self.llm = self._init_llm()
 
     def _init_llm(self):
-        return ChatGroq(
-            api_key=os.getenv("GROQ_API_KEY"),
-            model=Config.LLM_MODEL_NAME,
-            temperature=0.0,
-        )
+        return get_llm_client()
 
     def _load_prompt(self, path: str) -> str:
         if not os.path.exists(path):
@@ -37,23 +37,40 @@ class ReRanker:
             return f.read()
 
     def rerank_with_llm(self, query: str, metadatas: List[dict]) -> List[dict]:
-        # Convert metadata to JSON string
-        formatted_results = json.dumps(metadatas, indent=2, ensure_ascii=False)
+        with span("rerank.format_prompt"):
+            # Convert metadata to JSON string
+            formatted_results = json.dumps(metadatas, indent=2, ensure_ascii=False)
 
-        # Insert into the prompt
-        prompt = self.prompt_template.format(query=query, results=formatted_results)
+            # Insert into the prompt
+            prompt = self.prompt_template.format(query=query, results=formatted_results)
 
-        # Get response
-        response = self.llm.invoke(prompt)
+        # Get response; any provider trouble (timeout, open circuit, errors) keeps the vector order
+        try:
+            with span("rerank.llm_invoke"):
+                response = self.llm.invoke(
+                    prompt,
+                    timeout=Config.RERANK_TIMEOUT,
+                    deadline=Config.RERANK_DEADLINE,
+                    hedge_delay=Config.RERANK_HEDGE_DELAY
+                )
+        except Exception as e:
+            print(f"⚠️ Rerank skipped, using vector order: {e}")
+            metrics.inc("rerank_fallbacks_total", labels={"reason": type(e).__name__})
+            return metadatas
+
+        record_llm_usage(response, "rerank")
         output = response.content.strip()
 
-        try:
-            # Try parsing the response back to list of dicts
-            reranked_metadatas = json.loads(output)
-            if isinstance(reranked_metadatas, list):
-                return reranked_metadatas
-        except json.JSONDecodeError:
-            print("❌ Failed to parse LLM output as JSON")
+        with span("rerank.parse"):
+            try:
+                # Try parsing the response back to list of dicts
+                reranked_metadatas = json.loads(output)
+                if isinstance(reranked_metadatas, list):
+                    return reranked_metadatas
+            except json.JSONDecodeError:
+                print("❌ Failed to parse LLM output as JSON")
+
+        metrics.inc("rerank_parse_failures_total")
 
         # Fallback to original results if parsing fails
         return metadatas
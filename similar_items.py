@@ -0,0 +1,282 @@
+import os
+import json
+import numpy as np
+from config import Config
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from vector_db import ChromaDBClient
+
+INDEX_VERSION = 1
+NEIGHBORS_FILE = "neighbors.npy"
+SCORES_FILE = "scores.npy"
+IDS_FILE = "ids.json"
+FULL_REBUILD_SHARE = 0.5  # an update touching more rows than this is cheaper as a full build
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_n(scores: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row-wise top-n column indices and scores of a (rows, cols) block, best first.
+    Rows with fewer than n valid columns are padded with -1 / -inf.
+    """
+    rows, cols = scores.shape
+    k = min(n, cols)
+    if k == 0:
+        return np.full((rows, n), -1, dtype=np.int32), np.full((rows, n), -np.inf, dtype=np.float32)
+
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    top = np.take_along_axis(top, order, axis=1).astype(np.int32)
+    top_scores = np.take_along_axis(top_scores, order, axis=1).astype(np.float32)
+
+    top[~np.isfinite(top_scores)] = -1
+    if k < n:
+        top = np.pad(top, ((0, 0), (0, n - k)), constant_values=-1)
+        top_scores = np.pad(top_scores, ((0, 0), (0, n - k)), constant_values=-np.inf)
+    return top, top_scores
+
+
+class SimilarItemsIndex:
+    def __init__(
+        self,
+        index_dir: str = Config.SIMILAR_ITEMS_DIR,
+        top_n: int = Config.SIMILAR_ITEMS_TOP_N,
+        same_category: bool = Config.SIMILAR_ITEMS_SAME_CATEGORY,
+        block_size: int = Config.SIMILAR_ITEMS_BLOCK_SIZE
+    ):
+        """
+        Precomputed item-to-item kNN graph over the stored embeddings. Row i of the int32
+        adjacency array holds the top-N neighbour rows of ids[i] (-1 padded), so serving a
+        "similar items" list is a dict lookup plus a row read instead of a vector query.
+        """
+        self.index_dir = Path(index_dir)
+        self.top_n = top_n
+        self.same_category = same_category
+        self.block_size = block_size
+        self.fingerprint: Optional[dict] = None
+        self.ids: List[str] = []
+        self.categories: List[str] = []
+        self.neighbors = np.empty((0, top_n), dtype=np.int32)
+        self.scores = np.empty((0, top_n), dtype=np.float32)
+        self._row_by_id: Dict[str, int] = {}
+
+    def compute_fingerprint(self, vector_db_client: ChromaDBClient) -> dict:
+        return {
+            "version": INDEX_VERSION,
+            "collection": vector_db_client.collection.name,
+            "count": vector_db_client.collection.count(),
+            "top_n": self.top_n,
+            "same_category": self.same_category,
+        }
+
+    def _load_vectors(self, vector_db_client: ChromaDBClient) -> Tuple[List[str], List[str], np.ndarray]:
+        ids, categories, vectors = [], [], []
+        for batch in vector_db_client.iter_batches(include=["embeddings", "metadatas"]):
+            ids.extend(batch["ids"])
+            categories.extend((metadata or {}).get("master_category") or "" for metadata in batch["metadatas"])
+            vectors.append(np.asarray(batch["embeddings"], dtype=np.float32))
+
+        matrix = np.concatenate(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        return ids, categories, _normalize(matrix) if len(matrix) else matrix
+
+    def _groups(self, categories: List[str]) -> List[np.ndarray]:
+        if not self.same_category:
+            return [np.arange(len(categories))]
+        by_category: Dict[str, List[int]] = {}
+        for row, master in enumerate(categories):
+            by_category.setdefault(master, []).append(row)
+        return [np.asarray(rows) for rows in by_category.values()]
+
+    def _search(self, vectors: np.ndarray, query_rows: np.ndarray, candidate_rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-N neighbours of `query_rows` among `candidate_rows`, processed in row blocks so only
+        a (block_size, len(candidate_rows)) score matrix is alive at a time.
+        """
+        neighbors = np.full((len(query_rows), self.top_n), -1, dtype=np.int32)
+        scores = np.full((len(query_rows), self.top_n), -np.inf, dtype=np.float32)
+        candidates = vectors[candidate_rows]
+
+        for start in range(0, len(query_rows), self.block_size):
+            block = query_rows[start:start + self.block_size]
+            block_scores = vectors[block] @ candidates.T
+            block_scores[block[:, None] == candidate_rows[None, :]] = -np.inf  # an item is not its own neighbour
+
+            top, top_scores = _top_n(block_scores, self.top_n)
+            mapped = np.where(top >= 0, candidate_rows[np.maximum(top, 0)], -1)
+            neighbors[start:start + len(block)] = mapped
+            scores[start:start + len(block)] = top_scores
+        return neighbors, scores
+
+    def build(self, vector_db_client: ChromaDBClient) -> "SimilarItemsIndex":
+        ids, categories, vectors = self._load_vectors(vector_db_client)
+        neighbors = np.full((len(ids), self.top_n), -1, dtype=np.int32)
+        scores = np.full((len(ids), self.top_n), -np.inf, dtype=np.float32)
+
+        for rows in self._groups(categories):
+            neighbors[rows], scores[rows] = self._search(vectors, rows, rows)
+
+        self._set(ids, categories, neighbors, scores)
+        self.fingerprint = self.compute_fingerprint(vector_db_client)
+        return self
+
+    def _merge_candidates(self, vectors: np.ndarray, neighbors: np.ndarray, scores: np.ndarray,
+                          rows: np.ndarray, candidate_rows: np.ndarray):
+        # Rows whose lists are still valid only need the candidates merged into their top-N
+        candidate_neighbors, candidate_scores = self._search(vectors, rows, candidate_rows)
+        merged_neighbors = np.hstack([neighbors[rows], candidate_neighbors])
+        merged_scores = np.hstack([scores[rows], candidate_scores])
+        top, top_scores = _top_n(merged_scores, self.top_n)
+        neighbors[rows] = np.where(top >= 0, np.take_along_axis(merged_neighbors, np.maximum(top, 0), axis=1), -1)
+        scores[rows] = top_scores
+
+    def update(self, vector_db_client: ChromaDBClient, changed_ids: Iterable[str] = ()) -> "SimilarItemsIndex":
+        """
+        Brings the graph in line with the store without an O(N²) rebuild. New items and
+        `changed_ids` (re-embedded or moved to another master_category) get a full neighbour
+        search, as do rows that listed a removed or changed item; every other row only merges
+        the new and changed items in as candidates. Falls back to a full build when the build
+        settings changed or most rows would need a new search anyway.
+        """
+        if not self.ids and not self.load():
+            return self.build(vector_db_client)
+
+        stored = self.fingerprint or {}
+        if stored.get("top_n") != self.top_n or stored.get("same_category") != self.same_category:
+            return self.build(vector_db_client)
+
+        ids, categories, vectors = self._load_vectors(vector_db_client)
+        position = {item_id: row for row, item_id in enumerate(ids)}
+        kept = [item_id for item_id in self.ids if item_id in position]
+        new_ids = [item_id for item_id in ids if item_id not in self._row_by_id]
+        changed = {str(item_id) for item_id in changed_ids} & set(kept)
+        if not new_ids and not changed and len(kept) == len(self.ids):
+            self.fingerprint = self.compute_fingerprint(vector_db_client)
+            return self
+
+        # Surviving rows keep their order and new ones are appended; stored row numbers are remapped
+        remap = np.full(len(self.ids), -1, dtype=np.int64)
+        old_rows = np.asarray([self._row_by_id[item_id] for item_id in kept], dtype=np.int64)
+        remap[old_rows] = np.arange(len(kept))
+        old_neighbors = np.asarray(self.neighbors)[old_rows] if len(kept) else np.empty((0, self.top_n), dtype=np.int32)
+        kept_neighbors = np.where(old_neighbors >= 0, remap[np.maximum(old_neighbors, 0)], -1)
+        changed_rows = np.asarray([row for row, item_id in enumerate(kept) if item_id in changed], dtype=np.int64)
+
+        total = len(kept) + len(new_ids)
+        # Rows that lost a neighbour, listed a changed item, or are new/changed themselves
+        dirty = np.ones(total, dtype=bool)
+        dirty[:len(kept)] = ((old_neighbors >= 0) & (kept_neighbors < 0)).any(axis=1) | \
+            np.isin(kept_neighbors, changed_rows).any(axis=1)
+        dirty[changed_rows] = True
+        if dirty.sum() > total * FULL_REBUILD_SHARE:
+            return self.build(vector_db_client)
+        candidate = np.zeros(total, dtype=bool)
+        candidate[changed_rows] = True
+        candidate[len(kept):] = True
+
+        order = np.asarray([position[item_id] for item_id in kept + new_ids])
+        vectors = vectors[order]
+        categories = [categories[row] for row in order]
+        neighbors = np.vstack([kept_neighbors, np.full((len(new_ids), self.top_n), -1)]).astype(np.int32)
+        scores = np.vstack([
+            np.asarray(self.scores, dtype=np.float32)[old_rows] if len(kept) else np.empty((0, self.top_n), dtype=np.float32),
+            np.full((len(new_ids), self.top_n), -np.inf, dtype=np.float32)
+        ])
+        scores[neighbors < 0] = -np.inf
+
+        for rows in self._groups(categories):
+            dirty_rows = rows[dirty[rows]]
+            if len(dirty_rows):
+                neighbors[dirty_rows], scores[dirty_rows] = self._search(vectors, dirty_rows, rows)
+            clean_rows, candidate_rows = rows[~dirty[rows]], rows[candidate[rows]]
+            if len(clean_rows) and len(candidate_rows):
+                self._merge_candidates(vectors, neighbors, scores, clean_rows, candidate_rows)
+
+        self._set(kept + new_ids, categories, neighbors, scores)
+        self.fingerprint = self.compute_fingerprint(vector_db_client)
+        return self
+
+    def _set(self, ids: List[str], categories: List[str], neighbors: np.ndarray, scores: np.ndarray):
+        self.ids = list(ids)
+        self.categories = list(categories)
+        self.neighbors = neighbors.astype(np.int32)
+        self.scores = np.where(np.isfinite(scores), scores, -np.inf).astype(np.float32)
+        self._row_by_id = {item_id: row for row, item_id in enumerate(self.ids)}
+
+    def save(self):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        # Arrays first, ID list last: a reader never sees new IDs paired with old arrays
+        for name, array in ((NEIGHBORS_FILE, self.neighbors), (SCORES_FILE, self.scores)):
+            tmp_path = self.index_dir / f"{name}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, self.index_dir / name)
+
+        tmp_path = self.index_dir / f"{IDS_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "ids": self.ids, "categories": self.categories}, f)
+        os.replace(tmp_path, self.index_dir / IDS_FILE)
+
+    def load(self) -> bool:
+        ids_path = self.index_dir / IDS_FILE
+        if not ids_path.exists():
+            return False
+        try:
+            with open(ids_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            # Memory-mapped so serving processes share the pages and load instantly
+            neighbors = np.load(self.index_dir / NEIGHBORS_FILE, mmap_mode="r")
+            scores = np.load(self.index_dir / SCORES_FILE, mmap_mode="r")
+        except Exception as e:
+            print(f"⚠️ Failed to load similar items index: {e}")
+            return False
+
+        if len(neighbors) != len(payload.get("ids", [])):
+            print("⚠️ Similar items index is inconsistent, ignoring it")
+            return False
+
+        self.fingerprint = payload.get("fingerprint")
+        self.ids = payload["ids"]
+        self.categories = payload.get("categories", [])
+        self.neighbors = neighbors
+        self.scores = scores
+        self._row_by_id = {item_id: row for row, item_id in enumerate(self.ids)}
+        return True
+
+    def is_stale(self, vector_db_client: ChromaDBClient) -> bool:
+        return self.fingerprint != self.compute_fingerprint(vector_db_client)
+
+    def get_similar_ids(self, product_id: str, k: Optional[int] = None) -> List[str]:
+        row = self._row_by_id.get(str(product_id))
+        if row is None:
+            return []
+        return [self.ids[neighbor] for neighbor in self.neighbors[row][:k or self.top_n] if neighbor >= 0]
+
+    def get_similar(self, product_id: str, k: Optional[int] = None) -> List[Tuple[str, float]]:
+        row = self._row_by_id.get(str(product_id))
+        if row is None:
+            return []
+        pairs = zip(self.neighbors[row][:k or self.top_n], self.scores[row][:k or self.top_n])
+        return [(self.ids[neighbor], float(score)) for neighbor, score in pairs if neighbor >= 0]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the item-to-item similar products graph.")
+    parser.add_argument("--full", action="store_true", help="Rebuild from scratch instead of adding new items")
+    args = parser.parse_args()
+
+    vector_client = ChromaDBClient(
+        collection_name=Config.VECTOR_COLLECTION_NAME,
+        persist_directory=Config.VECTOR_PERSIST_DIRECTORY
+    )
+
+    index = SimilarItemsIndex()
+    index = index.build(vector_client) if args.full else index.update(vector_client)
+    index.save()
+    print(f"✅ Stored {index.top_n} neighbours for {len(index.ids)} products in {index.index_dir}")
@@ -0,0 +1,383 @@
+import io
+import os
+import json
+import mmap
+import time
+import shutil
+import sqlite3
+import hashlib
+import zipfile
+import argparse
+import tempfile
+from pathlib import Path
+from config import Config
+from contextlib import closing
+from typing import Dict, Optional, Tuple
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+CHUNK_SIZE = 1024 * 1024
+# Transient SQLite side files; the backup API folds their contents into the copied database
+SQLITE_SIDE_SUFFIXES = ("-journal", "-wal", "-shm")
+
+
+def _artifact_targets() -> Dict[str, Path]:
+    """
+    Top-level bundle entries and where they live on a serving node.
+    Directories are bundled recursively; missing optional artifacts are skipped.
+    """
+    return {
+        "chroma_store": Path(Config.VECTOR_PERSIST_DIRECTORY),
+        "category_index.json": Path(Config.CATEGORY_INDEX_PATH),
+        "facet_index.json": Path(Config.FACET_INDEX_PATH),
+        "similar_items": Path(Config.SIMILAR_ITEMS_DIR),
+        "compressed_index": Path(Config.COMPRESSED_INDEX_DIR),
+        "metadata.jsonl": Path(Config.SNAPSHOT_METADATA_PATH),
+        "thumbnails": Path(Config.THUMBNAIL_CACHE_DIR),
+    }
+
+
+def _store_signature(store_dir: Path) -> Dict[str, Tuple[int, int]]:
+    """
+    Size and mtime of every file in the store, to detect another process writing to it
+    while a snapshot is built.
+    """
+    signature = {}
+    for root, _, filenames in os.walk(store_dir):
+        for filename in filenames:
+            if filename.endswith(SQLITE_SIDE_SUFFIXES):
+                continue
+            path = Path(root) / filename
+            stat = path.stat()
+            signature[path.relative_to(store_dir).as_posix()] = (stat.st_size, stat.st_mtime_ns)
+    return signature
+
+
+def _checksum_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _MappedReader(io.RawIOBase):
+    """
+    Minimal seekable file object over an mmap, so zipfile can read entries straight from the mapping.
+    """
+    def __init__(self, mm: mmap.mmap):
+        self._mm = mm
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._mm.seek(offset, whence)
+        return self._mm.tell()
+
+    def tell(self) -> int:
+        return self._mm.tell()
+
+    def readinto(self, buffer) -> int:
+        data = self._mm.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def is_node_ready() -> bool:
+    # The store may live on ephemeral disk (e.g. /tmp on a Space) while the marker survives a restart
+    return os.path.exists(Config.SNAPSHOT_READY_MARKER) and os.path.isdir(Config.VECTOR_PERSIST_DIRECTORY)
+
+
+class SnapshotBundle:
+    def __init__(self, path: str = Config.SNAPSHOT_PATH):
+        """
+        A single versioned, checksummed artifact holding everything a serving node needs:
+        the Chroma store, a metadata snapshot, the category index and warm thumbnail caches.
+        Entries are stored uncompressed so a node can memory-map the bundle and copy them out directly.
+        """
+        self.path = str(path)
+        self.checksum_path = f"{self.path}.sha256"
+
+    def _add_file(self, zf: zipfile.ZipFile, source: str, arcname: str, files: dict):
+        digest = hashlib.sha256()
+        size = 0
+        with open(source, "rb") as src, zf.open(arcname, "w", force_zip64=True) as dst:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+                size += len(chunk)
+        files[arcname] = {"sha256": digest.hexdigest(), "size": size}
+
+    def _add_path(self, zf: zipfile.ZipFile, source: Path, arcname: str, files: dict):
+        if source.is_dir():
+            for root, _, filenames in os.walk(source):
+                for filename in sorted(filenames):
+                    file_path = Path(root) / filename
+                    relative = file_path.relative_to(source).as_posix()
+                    self._add_file(zf, str(file_path), f"{arcname}/{relative}", files)
+        elif source.is_file():
+            self._add_file(zf, str(source), arcname, files)
+
+    def _stage_thumbnails(self, category_index, staging_dir: Path) -> Optional[Path]:
+        # Only landing-page thumbnails are bundled; everything else warms up on demand
+        from thumbnail_cache import ThumbnailCache
+
+        cache = ThumbnailCache()
+        if not cache.enabled:
+            return None
+
+        thumbnails_dir = staging_dir / "thumbnails"
+        sources = {}
+        for url in category_index.preview_image_urls():
+            digest = cache.ensure(url)
+            if not digest:
+                continue
+            sources[url] = digest
+            for width in cache.widths:
+                variant = Path(cache._variant_path(digest, width))
+                target = thumbnails_dir / variant.relative_to(cache.cache_dir)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(variant, target)
+
+        cache.flush()
+        thumbnails_dir.mkdir(parents=True, exist_ok=True)
+        with open(thumbnails_dir / "sources.json", "w", encoding="utf-8") as f:
+            json.dump(sources, f)
+        return thumbnails_dir
+
+    def _stage_store(self, store_dir: Path, staging_dir: Path) -> Path:
+        """
+        Copies the Chroma store for bundling. SQLite databases go through the backup API, so each
+        is a consistent copy; the HNSW segment files are plain copies.
+        """
+        target = staging_dir / "chroma_store"
+        for root, _, filenames in os.walk(store_dir):
+            for filename in filenames:
+                if filename.endswith(SQLITE_SIDE_SUFFIXES):
+                    continue
+                source = Path(root) / filename
+                destination = target / source.relative_to(store_dir)
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                if filename.endswith(".sqlite3"):
+                    with closing(sqlite3.connect(source)) as src, closing(sqlite3.connect(destination)) as dst:
+                        src.backup(dst)
+                else:
+                    shutil.copy2(source, destination)
+        return target
+
+    def _refresh_vector_indexes(self, vector_db_client):
+        """
+        Brings the local similar-items graph and compressed index up to date with the store
+        before they are bundled as-is, so a snapshot never pairs the store with indexes from an
+        older catalog. Missing (optional) indexes are skipped.
+        """
+        from similar_items import SimilarItemsIndex
+        from vector_compression import CompressedIndex
+
+        for index, refresh in (
+            (SimilarItemsIndex(), lambda index: index.update(vector_db_client).save()),
+            (CompressedIndex(), lambda index: index.update(vector_db_client)),
+        ):
+            if not index.load() or not index.is_stale(vector_db_client):
+                continue
+            print(f"🔄 {index.index_dir} is out of date with the store, updating it")
+            refresh(index)
+            if index.is_stale(vector_db_client):
+                raise RuntimeError(f"{index.index_dir} could not be brought up to date; rebuild it before snapshotting")
+
+    def build(self, csv_path: str = Config.STYLE_CSV, include_thumbnails: bool = True) -> dict:
+        """
+        Packages the store and derived artifacts. Nothing else may write to the store meanwhile
+        (stop ingest, catalog sync and the app first): the HNSW files can't be copied atomically,
+        so the build closes its own client, bundles a staged copy, and fails if the store changed
+        between opening it and finishing that copy.
+        """
+        from vector_db import ChromaDBClient
+        from category_index import CategoryIndex
+        from facet_index import FacetIndex
+
+        vector_client = ChromaDBClient(
+            collection_name=Config.VECTOR_COLLECTION_NAME,
+            persist_directory=Config.VECTOR_PERSIST_DIRECTORY
+        )
+        store_dir = Path(Config.VECTOR_PERSIST_DIRECTORY)
+        store_signature = _store_signature(store_dir)
+        targets = _artifact_targets()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+
+        with tempfile.TemporaryDirectory() as staging:
+            staging_dir = Path(staging)
+
+            # Freshly derived artifacts are staged so the bundle never picks up stale local copies
+            index = CategoryIndex(index_path=str(staging_dir / "category_index.json"))
+            index.build(csv_path, vector_client).save()
+            FacetIndex(index_path=str(staging_dir / "facet_index.json")).build(vector_client).save()
+            vector_client.export_to_jsonl(str(staging_dir / "metadata.jsonl"))
+            self._refresh_vector_indexes(vector_client)
+
+            sources = dict(targets)
+            sources["category_index.json"] = staging_dir / "category_index.json"
+            sources["facet_index.json"] = staging_dir / "facet_index.json"
+            sources["metadata.jsonl"] = staging_dir / "metadata.jsonl"
+            sources["thumbnails"] = self._stage_thumbnails(index, staging_dir) if include_thumbnails else None
+
+            item_count = vector_client.collection.count()
+            vector_client.close()
+            sources["chroma_store"] = self._stage_store(store_dir, staging_dir)
+            if _store_signature(store_dir) != store_signature:
+                raise RuntimeError(
+                    f"{store_dir} changed while the snapshot was being built; "
+                    f"stop whatever writes to it (ingest, catalog sync, the app) and build again"
+                )
+
+            files = {}
+            with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+                for arcname, source in sources.items():
+                    if source is not None:
+                        self._add_path(zf, Path(source), arcname, files)
+
+                manifest = {
+                    "format_version": SNAPSHOT_FORMAT_VERSION,
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "collection_name": Config.VECTOR_COLLECTION_NAME,
+                    "item_count": item_count,
+                    "embedding_model": Config.EMBEDDING_MODEL_NAME,
+                    "files": files,
+                }
+                zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+        os.replace(tmp_path, self.path)
+        with open(self.checksum_path, "w", encoding="utf-8") as f:
+            f.write(f"{_checksum_file(self.path)}  {os.path.basename(self.path)}\n")
+
+        print(f"✅ Built snapshot with {len(files)} files ({manifest['item_count']} items) at {self.path}")
+        return manifest
+
+    def _verify_bundle(self, mm: mmap.mmap):
+        if not os.path.exists(self.checksum_path):
+            print(f"⚠️ No checksum file at {self.checksum_path}, relying on per-file checksums")
+            return
+        with open(self.checksum_path, "r", encoding="utf-8") as f:
+            expected = f.read().split()[0]
+        actual = hashlib.sha256(mm).hexdigest()
+        if actual != expected:
+            raise ValueError(f"Snapshot checksum mismatch: expected {expected}, got {actual}")
+
+    def _extract_member(self, zf: zipfile.ZipFile, arcname: str, info: dict, target: Path):
+        digest = hashlib.sha256()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with zf.open(arcname) as src, open(target, "wb") as dst:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+        if digest.hexdigest() != info["sha256"]:
+            raise ValueError(f"Checksum mismatch for {arcname}")
+
+    def load(self) -> dict:
+        """
+        Verifies the bundle, swaps its artifacts into place and marks the node ready.
+        The marker is cleared first, so a load that fails partway leaves the node not ready.
+        """
+        targets = _artifact_targets()
+        Path(Config.SNAPSHOT_READY_MARKER).unlink(missing_ok=True)
+
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            self._verify_bundle(mm)
+
+            with zipfile.ZipFile(_MappedReader(mm)) as zf:
+                manifest = json.loads(zf.read(MANIFEST_NAME))
+                if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+                    raise ValueError(f"Unsupported snapshot format: {manifest.get('format_version')}")
+
+                # Extract everything into staging paths first so a bad bundle never clobbers a working node
+                staged = {}
+                for arcname, info in manifest["files"].items():
+                    top, _, rest = arcname.partition("/")
+                    if top not in targets or ".." in Path(rest).parts:
+                        raise ValueError(f"Unexpected entry in snapshot: {arcname}")
+
+                    if top not in staged:
+                        staged[top] = Path(f"{targets[top]}.snapshot-tmp")
+                        if staged[top].is_dir():
+                            shutil.rmtree(staged[top])
+                    staging_root = staged[top]
+                    if top == arcname:
+                        self._extract_member(zf, arcname, info, staging_root)
+                    else:
+                        self._extract_member(zf, arcname, info, staging_root / rest)
+
+        for top, staging_root in staged.items():
+            target = targets[top]
+            if staging_root.is_dir():
+                previous = Path(f"{target}.snapshot-old")
+                if target.exists():
+                    shutil.rmtree(previous, ignore_errors=True)
+                    os.replace(target, previous)
+                os.replace(staging_root, target)
+                shutil.rmtree(previous, ignore_errors=True)
+            else:
+                os.replace(staging_root, target)
+
+        self._restamp_category_index()
+
+        marker_tmp = f"{Config.SNAPSHOT_READY_MARKER}.tmp"
+        with open(marker_tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "snapshot": os.path.basename(self.path),
+                "created_at": manifest["created_at"],
+                "item_count": manifest["item_count"],
+                "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            }, f, indent=2)
+        os.replace(marker_tmp, Config.SNAPSHOT_READY_MARKER)
+
+        print(f"✅ Loaded snapshot {self.path} ({manifest['item_count']} items), node marked ready")
+        return manifest
+
+    def _restamp_category_index(self):
+        # The bundled fingerprint describes the build machine; re-stamp it for this node
+        from vector_db import ChromaDBClient
+        from category_index import CategoryIndex
+
+        index = CategoryIndex()
+        if not index.load():
+            return
+        vector_client = ChromaDBClient(
+            collection_name=Config.VECTOR_COLLECTION_NAME,
+            persist_directory=Config.VECTOR_PERSIST_DIRECTORY
+        )
+        index.fingerprint = index.compute_fingerprint(Config.STYLE_CSV, vector_client)
+        index.save()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or load a serving snapshot bundle.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser(
+        "build", help="Package the store and caches into a snapshot (stop writers to the store first)"
+    )
+    build_parser.add_argument("--output", default=str(Config.SNAPSHOT_PATH))
+    build_parser.add_argument("--no-thumbnails", action="store_true", help="Skip bundling landing-page thumbnails")
+
+    load_parser = subparsers.add_parser("load", help="Verify and install a snapshot on this node")
+    load_parser.add_argument("--input", default=str(Config.SNAPSHOT_PATH))
+    load_parser.add_argument("--warmup", action="store_true", help="Load models and indexes after installing")
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+
+    if args.command == "build":
+        SnapshotBundle(args.output).build(include_thumbnails=not args.no_thumbnails)
+    else:
+        SnapshotBundle(args.input).load()
+        if args.warmup:
+            import app_resources
+            app_resources.warmup()
+
+    print(f"⏱️ {args.command} finished in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,101 @@
+import sys
+import time
+import json
+import threading
+import subprocess
+from config import Config
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+HEAVY_MODULES = ["streamlit", "pandas", "torch", "sentence_transformers", "chromadb", "langchain_groq"]
+APP_MODULES = [
+    "app_resources", "category_index", "thumbnail_cache", "vector_db",
+    "facet_index", "similar_items", "re_ranker", "data_retriever",
+]
+
+
+class StartupProfiler:
+    def __init__(self):
+        """
+        Records milestones (seconds since this module was first imported) and named durations
+        for the app's cold start, e.g. first_render and search_ready.
+        """
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self.marks: Dict[str, float] = {}
+        self.durations: Dict[str, float] = {}
+
+    def mark(self, name: str):
+        # Only the first occurrence counts; later reruns hit the same code path
+        with self._lock:
+            self.marks.setdefault(name, time.perf_counter() - self.started_at)
+
+    @contextmanager
+    def timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.durations[name] = time.perf_counter() - start
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "marks_s": {name: round(value, 3) for name, value in sorted(self.marks.items(), key=lambda item: item[1])},
+                "durations_s": {name: round(value, 3) for name, value in self.durations.items()},
+            }
+
+
+def measure_import_times(modules: List[str], python: str = sys.executable) -> Dict[str, Optional[float]]:
+    """
+    Cold import time of each module in a fresh interpreter, taken from the cumulative
+    column of `python -X importtime`. Modules that fail to import report None.
+    """
+    times = {}
+    for module in modules:
+        result = subprocess.run(
+            [python, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            cwd=str(Config.PROJECT_ROOT)
+        )
+        times[module] = None
+        if result.returncode != 0:
+            continue
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                times[module] = round(int(parts[1].strip()) / 1e6, 3)
+    return times
+
+
+profiler = StartupProfiler()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile the web app's cold start.")
+    parser.add_argument("--modules", nargs="*", help="Modules to time (default: heavy dependencies and app modules)")
+    parser.add_argument("--skip-warmup", action="store_true", help="Only measure import times")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    report = {"import_times_s": measure_import_times(args.modules or HEAVY_MODULES + APP_MODULES)}
+
+    if not args.skip_warmup:
+        import app_resources
+
+        # Mirrors web_app: the gallery renders from lightweight data, then models load
+        app_resources.get_gallery_index()
+        app_resources.get_thumbnail_cache()
+        profiler.mark("first_render")
+        app_resources.warmup()
+        report["startup"] = profiler.report()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,234 @@
+import os
+import time
+import bisect
+import threading
+import functools
+from config import Config
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Seconds; covers sub-millisecond DB lookups up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[dict]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[dict] = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        In-process counters and latency histograms, exported in Prometheus text format.
+        When disabled, every recording call returns immediately.
+        """
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[dict] = None):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[dict] = None):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = _Histogram(self.buckets)
+            series[key].observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Per-stage count and mean latency, for quick inspection in the debug panel.
+        """
+        rows = {}
+        with self._lock:
+            for key, hist in self._histograms.get("span_duration_seconds", {}).items():
+                stage = dict(key).get("stage", "")
+                rows[stage] = {
+                    "count": hist.count,
+                    "mean_ms": round(hist.total / hist.count * 1000, 2) if hist.count else 0.0,
+                    "p95_ms_bucket": self._quantile_bucket(hist, 0.95) * 1000,
+                }
+        return rows
+
+    @staticmethod
+    def _quantile_bucket(hist: _Histogram, quantile: float) -> float:
+        # Upper bound of the bucket that contains the quantile
+        target = hist.count * quantile
+        running = 0
+        for bound, count in zip(hist.buckets + (float("inf"),), hist.counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def export_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+            for name in sorted(self._histograms):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, {'le': f'{bound:g}'})} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, {'le': '+Inf'})} {hist.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.total:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+_enabled = os.getenv("TELEMETRY_ENABLED", str(Config.TELEMETRY_ENABLED)).lower() in ("1", "true", "yes")
+metrics = MetricsRegistry(enabled=_enabled)
+metrics.describe("span_duration_seconds", "Latency of instrumented stages in seconds.")
+metrics.describe("span_errors_total", "Instrumented stages that raised an exception.")
+metrics.describe("rerank_parse_failures_total", "LLM rerank responses that could not be parsed as a JSON list.")
+metrics.describe("rerank_fallbacks_total", "Searches that kept vector order because the rerank LLM call failed.")
+metrics.describe("html_clean_total", "Descriptor HTML cleaned during ingest, by path (local, llm_fallback, llm_fallback_failed).")
+metrics.describe("llm_tokens_total", "LLM tokens consumed, by call site and token type.")
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+@contextmanager
+def _timed_span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        metrics.inc("span_errors_total", labels={"stage": stage})
+        raise
+    finally:
+        metrics.observe("span_duration_seconds", time.perf_counter() - start, labels={"stage": stage})
+
+
+def span(stage: str):
+    """
+    Times the enclosed block as `stage`. Returns a shared no-op context manager when disabled.
+    """
+    if not metrics.enabled:
+        return _NOOP_SPAN
+    return _timed_span(stage)
+
+
+def traced(stage: str):
+    """
+    Decorator form of `span`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with _timed_span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_usage(response, call_site: str):
+    """
+    Adds prompt/completion token counts from a LangChain chat response, when the provider reports them.
+    """
+    if not metrics.enabled:
+        return
+    usage = getattr(response, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens")
+    completion_tokens = usage.get("output_tokens")
+    if prompt_tokens is None:
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage", {})
+        prompt_tokens = token_usage.get("prompt_tokens")
+        completion_tokens = token_usage.get("completion_tokens")
+
+    if prompt_tokens is not None:
+        metrics.inc("llm_tokens_total", prompt_tokens, labels={"call_site": call_site, "type": "prompt"})
+    if completion_tokens is not None:
+        metrics.inc("llm_tokens_total", completion_tokens, labels={"call_site": call_site, "type": "completion"})
+
+
+def start_metrics_server(port: int):
+    """
+    Serves `/metrics` from a daemon thread for Prometheus to scrape.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.export_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,286 @@
+import io
+import os
+import json
+import hashlib
+import threading
+import urllib.request
+from config import Config
+from collections import OrderedDict
+from urllib.parse import urlparse
+from typing import Dict, Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # Thumbnails are an optimisation; cards fall back to the source URL
+    Image = None
+
+EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp", "PNG": "png"}
+EVICTION_LOW_WATER = 0.9  # evict down to this share of max_cache_bytes, so inserts don't rescan every time
+
+
+class ThumbnailCache:
+    def __init__(
+        self,
+        cache_dir: str = Config.THUMBNAIL_CACHE_DIR,
+        image_dir: Optional[str] = Config.IMAGE_DIR,
+        url_prefix: str = Config.THUMBNAIL_URL_PREFIX,
+        widths: Iterable[int] = (Config.THUMBNAIL_CARD_WIDTH, Config.THUMBNAIL_DETAIL_WIDTH),
+        image_format: str = Config.THUMBNAIL_FORMAT,
+        max_cache_bytes: int = Config.THUMBNAIL_MAX_CACHE_BYTES,
+        fetch_timeout: float = 10.0,
+        max_workers: int = 4,
+        sources_flush_every: int = 200
+    ):
+        """
+        Content-addressed on-disk cache of resized product images.
+        Each source image is fetched once (from `image_dir` when a local copy exists, otherwise
+        over HTTP) and stored as one resized variant per width under its content hash.
+        The source index is written every `sources_flush_every` new entries, when a prefetch
+        queue drains, and on flush().
+        """
+        self.cache_dir = str(cache_dir)
+        self.image_dir = str(image_dir) if image_dir else None
+        self.url_prefix = url_prefix.rstrip("/")
+        self.widths = sorted(set(widths))
+        self.image_format = image_format.upper()
+        self.extension = EXTENSIONS[self.image_format]
+        self.max_cache_bytes = max_cache_bytes
+        self.fetch_timeout = fetch_timeout
+        self.sources_flush_every = sources_flush_every
+        self.enabled = Image is not None
+
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self._sources_path = os.path.join(self.cache_dir, "sources.json")
+        self._unsaved_sources = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._sources = self._load_sources()
+        # Bytes per content hash (all widths), least recently used first; disk is scanned only here
+        self._entries: "OrderedDict[str, int]" = self._scan_entries()
+        self._cache_bytes = sum(self._entries.values())
+
+    def _load_sources(self) -> dict:
+        # Maps a source URL/path to the content hash of the image it resolved to
+        if not os.path.exists(self._sources_path):
+            return {}
+        try:
+            with open(self._sources_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Failed to load thumbnail index: {e}")
+            return {}
+
+    def _save_sources(self):
+        # Callers hold self._lock
+        tmp_path = f"{self._sources_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._sources, f)
+        os.replace(tmp_path, self._sources_path)
+        self._unsaved_sources = 0
+
+    def flush(self):
+        """
+        Writes source entries added since the last save to sources.json.
+        """
+        with self._lock:
+            if self._unsaved_sources:
+                self._save_sources()
+
+    def _variant_path(self, digest: str, width: int) -> str:
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}_{width}.{self.extension}")
+
+    def _local_source_path(self, source: str) -> Optional[str]:
+        if os.path.isfile(source):
+            return source
+        if not self.image_dir:
+            return None
+        filename = os.path.basename(urlparse(source).path)
+        candidate = os.path.join(self.image_dir, filename)
+        return candidate if filename and os.path.isfile(candidate) else None
+
+    def _read_source(self, source: str) -> bytes:
+        local_path = self._local_source_path(source)
+        if local_path:
+            with open(local_path, "rb") as f:
+                return f.read()
+
+        with urllib.request.urlopen(source, timeout=self.fetch_timeout) as response:
+            return response.read()
+
+    def _write_variants(self, digest: str, data: bytes):
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert("RGB")
+            for width in self.widths:
+                path = self._variant_path(digest, width)
+                if os.path.exists(path):
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+
+                variant = image.copy()
+                variant.thumbnail((width, width * 4))
+                tmp_path = f"{path}.tmp"
+                variant.save(tmp_path, format=self.image_format, quality=80, optimize=True)
+                os.replace(tmp_path, path)
+
+    def ensure(self, source: str) -> Optional[str]:
+        """
+        Makes sure every width variant of `source` is cached and returns its content hash.
+        """
+        if not self.enabled or not source:
+            return None
+
+        digest = self._sources.get(source)
+        if digest and all(os.path.exists(self._variant_path(digest, w)) for w in self.widths):
+            return digest
+
+        try:
+            data = self._read_source(source)
+            digest = hashlib.sha256(data).hexdigest()
+            self._write_variants(digest, data)
+            size = self._entry_size(digest)
+        except Exception as e:
+            print(f"⚠️ Failed to build thumbnail for {source}: {e}")
+            return None
+
+        with self._lock:
+            self._cache_bytes += size - self._entries.pop(digest, 0)
+            self._entries[digest] = size
+            self._sources[source] = digest
+            # Rewriting the whole index per thumbnail would be quadratic over a full-catalog build
+            self._unsaved_sources += 1
+            if self._unsaved_sources >= self.sources_flush_every:
+                self._save_sources()
+            over_budget = self._cache_bytes > self.max_cache_bytes
+        if over_budget:
+            self.evict()
+        return digest
+
+    def get_path(self, source: str, width: int) -> Optional[str]:
+        digest = self._sources.get(source)
+        if not digest:
+            return None
+        path = self._variant_path(digest, width)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # Keeps the LRU order across restarts
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+        return path
+
+    def get_url(self, source: str, width: int) -> Optional[str]:
+        path = self.get_path(source, width)
+        if not path:
+            return None
+        relative = os.path.relpath(path, self.cache_dir).replace(os.sep, "/")
+        return f"{self.url_prefix}/{relative}"
+
+    def prefetch(self, sources: Iterable[str]):
+        """
+        Builds thumbnails for `sources` on background threads, skipping ones already queued.
+        """
+        if not self.enabled:
+            return
+        for source in sources:
+            if not source:
+                continue
+            with self._lock:
+                if source in self._pending:
+                    continue
+                self._pending.add(source)
+            self._executor.submit(self._prefetch_one, source)
+
+    def _prefetch_one(self, source: str):
+        try:
+            self.ensure(source)
+        finally:
+            with self._lock:
+                self._pending.discard(source)
+                drained = not self._pending
+            if drained:
+                self.flush()
+
+    def card_src(self, source: str, width: int = Config.THUMBNAIL_CARD_WIDTH) -> str:
+        """
+        Returns the cached thumbnail URL when available. Otherwise queues a background
+        fetch and returns the original source so the first render is never blocked.
+        """
+        url = self.get_url(source, width)
+        if url:
+            return url
+        self.prefetch([source])
+        return source
+
+    def _entry_size(self, digest: str) -> int:
+        paths = (self._variant_path(digest, width) for width in self.widths)
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+    def _scan_entries(self) -> "OrderedDict[str, int]":
+        # Variants are named <digest>_<width>.<ext>; an entry is as recent as its newest variant
+        sizes: Dict[str, int] = {}
+        last_used: Dict[str, float] = {}
+        for root, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if not filename.endswith(f".{self.extension}") or "_" not in filename:
+                    continue
+                digest = filename.rsplit("_", 1)[0]
+                stat = os.stat(os.path.join(root, filename))
+                sizes[digest] = sizes.get(digest, 0) + stat.st_size
+                last_used[digest] = max(last_used.get(digest, 0.0), stat.st_mtime)
+        return OrderedDict((digest, sizes[digest]) for digest in sorted(sizes, key=last_used.get))
+
+    def evict(self):
+        """
+        Removes least recently used images, every width at once, until the cache is back under
+        EVICTION_LOW_WATER of `max_cache_bytes`.
+        """
+        target = self.max_cache_bytes * EVICTION_LOW_WATER
+        with self._lock:
+            while self._entries and self._cache_bytes > target:
+                digest, size = self._entries.popitem(last=False)
+                for width in self.widths:
+                    try:
+                        os.remove(self._variant_path(digest, width))
+                    except OSError:
+                        continue
+                self._cache_bytes -= size
+
+    @property
+    def size_bytes(self) -> int:
+        return self._cache_bytes
+
+    def cached_sources(self) -> List[str]:
+        return list(self._sources)
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    from tqdm import tqdm
+    from category_index import CategoryIndex
+
+    cache = ThumbnailCache()
+    images_df = pd.read_csv(Config.IMAGE_CSV).dropna(subset=["link"])
+    link_by_file = dict(zip(images_df["file_name"], images_df["link"]))
+
+    # Only what the first screens show: gallery previews, then the first page of every subcategory
+    index = CategoryIndex()
+    if not index.load():
+        raise SystemExit("❌ No category index; build it with category_index.py first")
+    links = list(index.preview_image_urls())
+    for entry in index.categories.values():
+        links.extend(link_by_file.get(f"{product_id}.jpg") for product_id in entry["product_ids"][:Config.PAGINATION_IMAGE])
+    links = list(dict.fromkeys(link for link in links if link))
+
+    built = 0
+    for link in tqdm(links, desc="🖼️ Building thumbnails", unit="image"):
+        # Stop before eviction would start discarding what was just built
+        if cache.size_bytes >= cache.max_cache_bytes * EVICTION_LOW_WATER:
+            print(f"⚠️ Thumbnail budget reached after {built} of {len(links)} images")
+            break
+        if cache.ensure(link):
+            built += 1
+    cache.flush()
+    print(f"✅ Cached thumbnails for {built} images in {cache.cache_dir}")
@@ -1,7 +1,9 @@
-import pandas as pd
+import re
 
 
 def _load_category_tree(csv_path) -> dict:
+    import pandas as pd
+
     df = pd.read_csv(csv_path)
     df = df.drop_duplicates()
 
@@ -12,6 +14,9 @@ def _load_category_tree(csv_path) -> dict:
     )
     return category_tree
 
+def clean_label(text) -> str:
+    return re.sub(r"[^\w\s&]+", "", text).strip()
+
 def get_category_tree():
     category_dict = {
         "👜 Accessories": {
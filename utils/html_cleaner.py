@@ -0,0 +1,118 @@
+import re
+import html
+from html.parser import HTMLParser
+
+BLOCK_TAGS = {"p", "div", "br", "li", "ul", "ol", "tr", "table", "h1", "h2", "h3", "h4", "h5", "h6", "section"}
+SKIP_TAGS = {"script", "style"}
+
+ENTITY_NAMES = r"(rsquo|lsquo|rdquo|ldquo|bull|nbsp|ndash|mdash|hellip|amp|quot)"
+LEFTOVER_MARKUP = re.compile(r"</?[a-zA-Z][^>]*>|&(?:[a-zA-Z]+|#\d+|#x[0-9a-fA-F]+);|&\s*" + ENTITY_NAMES + r"\b")
+# Entities mangled by the source feed, e.g. "fastrack&amp;  rsquo s"
+BROKEN_ENTITY = re.compile(r"\s*&\s*" + ENTITY_NAMES + r"\b\s*;?\s*")
+BULLET_PREFIX = re.compile(r"^\s*(?:[-*•·●▪]+|\(?\d{1,2}[.)]|\(?[a-zA-Z][.)](?=\s))\s*")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+MAX_SENTENCE_WORDS = 80
+
+
+class _TextCollector(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = [[]]
+        self._skip_depth = 0
+
+    def _break(self):
+        if self.lines[-1]:
+            self.lines.append([])
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        # Plain newlines inside the source also separate list items
+        parts = data.split("\n")
+        self.lines[-1].append(parts[0])
+        for part in parts[1:]:
+            self._break()
+            self.lines[-1].append(part)
+
+
+def _repair_entities(text: str) -> str:
+    def replace(match):
+        name = match.group(1)
+        char = html.unescape(f"&{name};")
+        if name in ("rsquo", "lsquo"):
+            return char
+        return f" {char} " if name not in ("nbsp",) else " "
+
+    return re.sub(r"’ s\b", "’s", BROKEN_ENTITY.sub(replace, text))
+
+
+def _normalize_whitespace(text: str) -> str:
+    return re.sub(r"\s+", " ", text.replace("\xa0", " ")).strip()
+
+
+def clean_html(html_content: str) -> str:
+    """
+    Strips tags, decodes entities, flattens lists into sentences and normalizes whitespace,
+    producing a single paragraph.
+    """
+    if not html_content or not html_content.strip():
+        return ""
+
+    collector = _TextCollector()
+    # Some sources double-escape their markup (e.g. "&lt;br /&gt;")
+    collector.feed(html.unescape(html_content) if "&lt;" in html_content else html_content)
+    collector.close()
+
+    sentences = []
+    for parts in collector.lines:
+        line = _normalize_whitespace(_repair_entities(html.unescape("".join(parts))))
+        line = BULLET_PREFIX.sub("", line).strip()
+        if not line:
+            continue
+        if line[-1] not in ".!?:;":
+            line += "."
+        sentences.append(line[0].upper() + line[1:])
+
+    return " ".join(sentences)
+
+
+def needs_llm_cleanup(cleaned: str, original: str) -> bool:
+    """
+    Flags local output that still looks wrong: leftover markup or entities, text lost entirely,
+    or a very long run-on sentence.
+    """
+    if not original or not original.strip():
+        return False
+    if not cleaned:
+        return True
+    if LEFTOVER_MARKUP.search(cleaned):
+        return True
+    return any(len(sentence.split()) > MAX_SENTENCE_WORDS for sentence in SENTENCE_SPLIT.split(cleaned))
+
+
+if __name__ == "__main__":
+    sample = (
+        "1. A   football for soccer games in all weather conditions<br /> "
+        "2. puma's hi-tech airlock valve to keep the ball bouncy at 8-12 PSI,   0.6-0.8 bar<br /> <br /> "
+        "<ul><li>Machine wash&nbsp;cold</li><li>Do not bleach</li></ul>"
+    )
+    cleaned = clean_html(sample)
+    print(cleaned)
+    print("needs LLM:", needs_llm_cleanup(cleaned, sample))
@@ -23,6 +23,42 @@ def get_metadata_display_fields():
     return fields_to_display
 
 
+def get_paragraph_template_fields():
+    # Order in which template paragraphs mention fields; later entries are appended verbatim
+    fields_in_order = [
+        "product_name",
+        "brand",
+        "gender",
+        "base_colour",
+        "product_type",
+        "master_category",
+        "sub_category",
+        "usage",
+        "season",
+        "year",
+        "price",
+        "description",
+        "style_note",
+        "materials_care",
+    ]
+
+    return fields_in_order
+
+
+def get_facet_fields():
+    # Categorical fields offered as browse/search filters, with their sidebar labels
+    facet_fields = [
+        ("base_colour", "Color"),
+        ("gender", "Gender"),
+        ("season", "Season"),
+        ("usage", "Usage"),
+    ]
+
+    return facet_fields
+
+
 if __name__ == "__main__":
     metadata_fields = get_metadata_display_fields()
-    print(metadata_fields)
\ No newline at end of file
+    print(metadata_fields)
+    print(get_paragraph_template_fields())
+    print(get_facet_fields())
\ No newline at end of file
@@ -0,0 +1,413 @@
+import os
+import json
+import time
+import numpy as np
+from config import Config
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from vector_db import ChromaDBClient
+
+INDEX_VERSION = 1
+FULL_FILE = "full.npy"
+CODES_FILE = "codes.npy"
+PROJECTION_FILE = "projection.npz"
+IDS_FILE = "ids.json"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class VectorProjection:
+    def __init__(self, method: str = Config.COMPRESSION_METHOD, dims: int = Config.COMPRESSION_DIMS, quantize: bool = Config.COMPRESSION_QUANTIZE):
+        """
+        Linear map from the embedding space to `dims` dimensions (PCA or a Gaussian random
+        projection), optionally followed by symmetric per-dimension int8 scalar quantization.
+        """
+        if method not in ("pca", "random"):
+            raise ValueError(f"Unknown projection method: {method}")
+        self.method = method
+        self.dims = dims
+        self.quantize = quantize
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+
+    def fit(self, sample: np.ndarray, seed: int = 0) -> "VectorProjection":
+        sample = np.asarray(sample, dtype=np.float32)
+        source_dims = sample.shape[1]
+        dims = min(self.dims, source_dims)
+
+        if self.method == "pca":
+            self.mean = sample.mean(axis=0)
+            centered = sample - self.mean
+            covariance = centered.T @ centered / max(1, len(sample) - 1)
+            eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+            self.components = eigenvectors[:, np.argsort(eigenvalues)[::-1][:dims]].T.astype(np.float32)
+        else:
+            rng = np.random.default_rng(seed)
+            self.mean = np.zeros(source_dims, dtype=np.float32)
+            self.components = (rng.standard_normal((dims, source_dims)) / np.sqrt(dims)).astype(np.float32)
+
+        if self.quantize:
+            # Clip the rare extreme coordinate instead of spending int8 range on it
+            projected = self.project(sample)
+            self.scales = np.maximum(np.percentile(np.abs(projected), 99.9, axis=0), 1e-6).astype(np.float32) / 127.0
+        return self
+
+    def project(self, vectors: np.ndarray) -> np.ndarray:
+        # Items are centred; queries are not (see encode_query), which keeps the ranking of q·x intact
+        return ((vectors - self.mean) @ self.components.T).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        projected = self.project(vectors)
+        if not self.quantize:
+            return projected.astype(np.float16)
+        return np.clip(np.rint(projected / self.scales), -127, 127).astype(np.int8)
+
+    def encode_query(self, query: np.ndarray) -> np.ndarray:
+        """
+        Weights such that `codes @ weights` approximates q·x up to a per-query constant.
+        """
+        weights = self.components @ query
+        return (weights * self.scales if self.quantize else weights).astype(np.float32)
+
+    def bytes_per_vector(self) -> int:
+        return self.components.shape[0] * (1 if self.quantize else 2)
+
+    def save(self, path: Path):
+        np.savez(
+            path,
+            method=self.method,
+            quantize=self.quantize,
+            mean=self.mean,
+            components=self.components,
+            scales=self.scales if self.scales is not None else np.empty(0, dtype=np.float32),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "VectorProjection":
+        with np.load(path) as data:
+            projection = cls(str(data["method"]), int(data["components"].shape[0]), bool(data["quantize"]))
+            projection.mean = data["mean"]
+            projection.components = data["components"]
+            projection.scales = data["scales"] if projection.quantize else None
+        return projection
+
+
+class CompressedIndex:
+    def __init__(
+        self,
+        index_dir: str = Config.COMPRESSED_INDEX_DIR,
+        projection: Optional[VectorProjection] = None,
+        oversample: int = Config.COMPRESSION_OVERSAMPLE,
+        block_size: int = Config.COMPRESSION_BLOCK_SIZE
+    ):
+        """
+        Two-stage search: a scan over compact projected codes picks `k * oversample` candidates,
+        which are rescored exactly against the full normalized vectors in a memory-mapped .npy.
+        Only the codes need to stay resident; full vectors are paged in per candidate.
+        """
+        self.index_dir = Path(index_dir)
+        self.projection = projection or VectorProjection()
+        self.oversample = oversample
+        self.block_size = block_size
+        self.fingerprint: Optional[dict] = None
+        self.ids: List[str] = []
+        self.full: Optional[np.ndarray] = None
+        self.codes: Optional[np.ndarray] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def compute_fingerprint(self, vector_db_client: ChromaDBClient) -> dict:
+        return {
+            "version": INDEX_VERSION,
+            "collection": vector_db_client.collection.name,
+            "count": vector_db_client.collection.count(),
+            "method": self.projection.method,
+            "dims": self.projection.dims,
+            "quantize": self.projection.quantize,
+        }
+
+    def _write_full(self, vector_db_client: ChromaDBClient, path: Path) -> List[str]:
+        expected = vector_db_client.collection.count()
+        ids, full = [], None
+        try:
+            for batch in vector_db_client.iter_batches(include=["embeddings"]):
+                vectors = _normalize(np.asarray(batch["embeddings"], dtype=np.float32))
+                if full is None:
+                    full = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(expected, vectors.shape[1]))
+                rows = min(len(vectors), expected - len(ids))
+                full[len(ids):len(ids) + rows] = vectors[:rows]
+                ids.extend(batch["ids"][:rows])
+            if full is not None:
+                full.flush()
+        finally:
+            del full
+        if len(ids) != expected:
+            raise ValueError(f"Collection changed during build: expected {expected} items, read {len(ids)}")
+        return ids
+
+    def _write_codes(self, full: np.ndarray, path: Path, existing: Optional[np.ndarray] = None, reencode: Iterable[int] = ()):
+        code_dtype = np.int8 if self.projection.quantize else np.float16
+        codes = np.lib.format.open_memmap(
+            path, mode="w+", dtype=code_dtype, shape=(len(full), self.projection.components.shape[0])
+        )
+        start = 0
+        if existing is not None:
+            codes[:len(existing)] = existing
+            start = len(existing)
+        for block_start in range(start, len(full), self.block_size):
+            block = np.asarray(full[block_start:block_start + self.block_size])
+            codes[block_start:block_start + len(block)] = self.projection.encode(block)
+        reencode = np.asarray(sorted(reencode), dtype=np.int64)
+        for block_start in range(0, len(reencode), self.block_size):
+            rows = reencode[block_start:block_start + self.block_size]
+            codes[rows] = self.projection.encode(np.asarray(full[rows]))
+        codes.flush()
+        del codes
+
+    def _fit_sample(self, full: np.ndarray, seed: int = 0) -> np.ndarray:
+        sample_size = min(len(full), Config.COMPRESSION_FIT_SAMPLE)
+        rows = np.sort(np.random.default_rng(seed).choice(len(full), sample_size, replace=False))
+        return np.asarray(full[rows])
+
+    def build(self, vector_db_client: ChromaDBClient) -> "CompressedIndex":
+        """
+        Streams the store into the full-vector memmap, fits the projection on a sample and
+        encodes every vector. Nothing larger than one batch or the fit sample is held in memory.
+        """
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        full_tmp = self.index_dir / f"{FULL_FILE}.tmp"
+        codes_tmp = self.index_dir / f"{CODES_FILE}.tmp"
+
+        ids = self._write_full(vector_db_client, full_tmp)
+        if not ids:
+            raise ValueError("Cannot build a compressed index from an empty collection")
+        full = np.load(full_tmp, mmap_mode="r")
+        self.projection.fit(self._fit_sample(full))
+        self._write_codes(full, codes_tmp)
+        del full
+
+        self._install(ids, full_tmp, codes_tmp, vector_db_client)
+        return self
+
+    def update(self, vector_db_client: ChromaDBClient, changed_ids: Iterable[str] = ()) -> "CompressedIndex":
+        """
+        Brings the index in line with the store using the stored projection: removed items are
+        compacted out, new ones appended, and `changed_ids` (re-embedded items) re-encoded.
+        The projection is only refit by a full `build`.
+        """
+        if not self.ids and not self.load():
+            return self.build(vector_db_client)
+
+        stored_ids = set(vector_db_client.get_all_ids())
+        known = set(self.ids)
+        kept_rows = np.asarray([row for row, item_id in enumerate(self.ids) if item_id in stored_ids], dtype=np.int64)
+        new_ids = sorted(stored_ids - known)
+        changed = set(changed_ids) & known & stored_ids
+        if len(kept_rows) == self.size and not new_ids and not changed:
+            return self
+        ids = [self.ids[row] for row in kept_rows] + new_ids
+        if not ids:
+            return self.build(vector_db_client)
+
+        full_tmp = self.index_dir / f"{FULL_FILE}.tmp"
+        codes_tmp = self.index_dir / f"{CODES_FILE}.tmp"
+        full = np.lib.format.open_memmap(full_tmp, mode="w+", dtype=np.float32, shape=(len(ids), self.full.shape[1]))
+        for start in range(0, len(kept_rows), self.block_size):
+            rows = kept_rows[start:start + self.block_size]
+            full[start:start + len(rows)] = self.full[rows]
+
+        positions = {item_id: position for position, item_id in enumerate(ids)}
+        refresh = [item_id for item_id in ids if item_id in changed] + new_ids
+        for start in range(0, len(refresh), 500):
+            batch_ids = refresh[start:start + 500]
+            result = vector_db_client.collection.get(ids=batch_ids, include=["embeddings"])
+            by_id = dict(zip(result["ids"], result["embeddings"]))
+            rows = [positions[item_id] for item_id in batch_ids]
+            full[rows] = _normalize(np.asarray([by_id[item_id] for item_id in batch_ids], dtype=np.float32))
+        full.flush()
+
+        self._write_codes(
+            full, codes_tmp,
+            existing=np.asarray(self.codes[kept_rows]),
+            reencode=(positions[item_id] for item_id in changed)
+        )
+        del full
+        self._install(ids, full_tmp, codes_tmp, vector_db_client)
+        return self
+
+    def _install(self, ids: List[str], full_tmp: Path, codes_tmp: Path, vector_db_client: ChromaDBClient):
+        # Release our own mappings before replacing the files underneath them
+        self.full = self.codes = None
+        os.replace(full_tmp, self.index_dir / FULL_FILE)
+        os.replace(codes_tmp, self.index_dir / CODES_FILE)
+        self.projection.save(self.index_dir / PROJECTION_FILE)
+
+        self.fingerprint = self.compute_fingerprint(vector_db_client)
+        tmp_path = self.index_dir / f"{IDS_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "ids": ids}, f)
+        os.replace(tmp_path, self.index_dir / IDS_FILE)
+        self.load()
+
+    def load(self) -> bool:
+        ids_path = self.index_dir / IDS_FILE
+        if not ids_path.exists():
+            return False
+        try:
+            with open(ids_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            projection = VectorProjection.load(self.index_dir / PROJECTION_FILE)
+            full = np.load(self.index_dir / FULL_FILE, mmap_mode="r")
+            codes = np.load(self.index_dir / CODES_FILE, mmap_mode="r")
+        except Exception as e:
+            print(f"⚠️ Failed to load compressed index: {e}")
+            return False
+
+        if not len(full) == len(codes) == len(payload.get("ids", [])):
+            print("⚠️ Compressed index is inconsistent, ignoring it")
+            return False
+
+        self.fingerprint = payload.get("fingerprint")
+        self.ids = payload["ids"]
+        self.projection = projection
+        self.full = full
+        self.codes = codes
+        return True
+
+    def is_stale(self, vector_db_client: ChromaDBClient) -> bool:
+        return self.fingerprint != self.compute_fingerprint(vector_db_client)
+
+    def candidate_rows(self, query: np.ndarray, count: int) -> np.ndarray:
+        weights = self.projection.encode_query(query)
+        scores = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, self.block_size):
+            block = np.asarray(self.codes[start:start + self.block_size], dtype=np.float32)
+            scores[start:start + len(block)] = block @ weights
+        return _top_k(scores, count)
+
+    def search(self, query_embedding, k: int, oversample: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Returns the top `k` (id, cosine similarity) pairs: compressed scan, then exact rescoring.
+        """
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32)[None, :])[0]
+        candidates = np.sort(self.candidate_rows(query, k * (oversample or self.oversample)))  # sorted for memmap locality
+        exact = np.asarray(self.full[candidates]) @ query
+        best = _top_k(exact, k)
+        return [(self.ids[candidates[row]], float(exact[row])) for row in best]
+
+    def memory_footprint(self) -> Dict[str, int]:
+        return {
+            "codes_bytes": int(self.codes.nbytes) if self.codes is not None else 0,
+            "full_bytes": int(self.full.nbytes) if self.full is not None else 0,
+        }
+
+
+def recall_report(
+    full: np.ndarray,
+    configs: List[dict],
+    k: int = Config.TOP_K,
+    num_queries: int = 200,
+    seed: int = 0
+) -> List[dict]:
+    """
+    Recall@k of the two-stage search against exact search for each projection config,
+    alongside stage-1 bytes per vector and query latency. Queries are sampled stored vectors
+    with a little noise; each query's own item is excluded from both result lists.
+    """
+    rng = np.random.default_rng(seed)
+    full = np.asarray(full, dtype=np.float32)
+    query_rows = rng.choice(len(full), min(num_queries, len(full)), replace=False)
+    queries = _normalize(full[query_rows] + rng.normal(0, 0.02, (len(query_rows), full.shape[1])).astype(np.float32))
+
+    exact_scores = queries @ full.T
+    exact_scores[np.arange(len(query_rows)), query_rows] = -np.inf
+    exact_top = [set(_top_k(row, k)) for row in exact_scores]
+
+    sample = full[np.sort(rng.choice(len(full), min(len(full), Config.COMPRESSION_FIT_SAMPLE), replace=False))]
+    rows = []
+    for config in configs:
+        projection = VectorProjection(config["method"], config["dims"], config["quantize"]).fit(sample, seed)
+        index = CompressedIndex(projection=projection)
+        index.ids = [str(row) for row in range(len(full))]
+        index.full = full
+        index.codes = projection.encode(full)
+
+        for oversample in config.get("oversample", [Config.COMPRESSION_OVERSAMPLE]):
+            hits, start = 0, time.perf_counter()
+            for query, query_row, expected in zip(queries, query_rows, exact_top):
+                found = [int(item_id) for item_id, _ in index.search(query, k + 1, oversample)]
+                hits += len(expected.intersection([row for row in found if row != query_row][:k]))
+            elapsed = time.perf_counter() - start
+
+            rows.append({
+                "method": config["method"],
+                "dims": projection.components.shape[0],
+                "quantize": config["quantize"],
+                "oversample": oversample,
+                f"recall@{k}": round(hits / (len(query_rows) * k), 4),
+                "stage1_bytes_per_vector": projection.bytes_per_vector(),
+                "full_bytes_per_vector": full.shape[1] * 4,
+                "compression_ratio": round(full.shape[1] * 4 / projection.bytes_per_vector(), 1),
+                "latency_ms": round(elapsed / len(query_rows) * 1000, 3),
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the compressed first-stage index or report recall versus memory.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Fit the projection and encode the store")
+    build_parser.add_argument("--update", action="store_true", help="Only apply items added or removed since the last build")
+
+    report_parser = subparsers.add_parser("report", help="Recall@k versus stage-1 memory for several configurations")
+    report_parser.add_argument("--dims", type=int, nargs="+", default=[64, 128, 192, 256])
+    report_parser.add_argument("--oversample", type=int, nargs="+", default=[2, 4, 8])
+    report_parser.add_argument("--methods", nargs="+", default=["pca", "random"])
+    report_parser.add_argument("--queries", type=int, default=200)
+    report_parser.add_argument("--top-k", type=int, default=Config.TOP_K)
+    report_parser.add_argument("--output", help="Write the JSON report to this path")
+
+    args = parser.parse_args()
+
+    vector_client = ChromaDBClient(
+        collection_name=Config.VECTOR_COLLECTION_NAME,
+        persist_directory=Config.VECTOR_PERSIST_DIRECTORY
+    )
+
+    if args.command == "build":
+        index = CompressedIndex()
+        index = index.update(vector_client) if args.update else index.build(vector_client)
+        footprint = index.memory_footprint()
+        print(f"✅ Encoded {index.size} vectors to {index.projection.components.shape[0]} dims "
+              f"({footprint['codes_bytes'] / 1e6:.1f}MB stage-1, {footprint['full_bytes'] / 1e6:.1f}MB full) in {index.index_dir}")
+    else:
+        index = CompressedIndex()
+        if not index.load():
+            index.build(vector_client)
+        configs = [
+            {"method": method, "dims": dims, "quantize": quantize, "oversample": args.oversample}
+            for method in args.methods for dims in args.dims for quantize in (False, True)
+        ]
+        report = recall_report(index.full, configs, k=args.top_k, num_queries=args.queries)
+        for row in report:
+            print(row)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
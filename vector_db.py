@@ -1,17 +1,59 @@
-import chromadb
+import os
+import csv
+import json
 import numpy as np
-import pandas as pd
 from config import Config
-from typing import List, Optional
+from telemetry import traced
+from typing import Callable, Iterable, Iterator, List, Optional
+from vector_partitions import PartitionedCollection
+
+RESIZE_BLOCK_ROWS = 8192
+
+
+def _resize_npy(array: np.memmap, path: str, rows: int, keep: int) -> np.memmap:
+    """
+    Replaces the .npy memmap at `path` with one of `rows` rows holding its first `keep` rows.
+    """
+    resized_path = f"{path}.resize"
+    resized = np.lib.format.open_memmap(resized_path, mode="w+", dtype=array.dtype, shape=(rows, array.shape[1]))
+    for start in range(0, keep, RESIZE_BLOCK_ROWS):
+        end = min(start + RESIZE_BLOCK_ROWS, keep)
+        resized[start:end] = array[start:end]
+    resized.flush()
+    os.replace(resized_path, path)
+    return resized
 
 
 class ChromaDBClient:
-    def __init__(self, collection_name: str, persist_directory: str):
+    def __init__(self, collection_name: str, persist_directory: str, layout: str = Config.VECTOR_LAYOUT):
         """
         Initializes a native ChromaDB client for storing precomputed embeddings.
+        With layout="partitioned", `collection` is a facade over one collection per master_category.
         """
+        import chromadb  # deferred so modules that only need the type import quickly
+
+        if layout not in ("single", "partitioned"):
+            raise ValueError(f"Unknown vector layout: {layout}")
+        self.layout = layout
         self.client = chromadb.PersistentClient(path=persist_directory)
-        self.collection = self.client.get_or_create_collection(name=collection_name)
+        if layout == "partitioned":
+            self.collection = PartitionedCollection(self.client, collection_name)
+        else:
+            self.collection = self.client.get_or_create_collection(name=collection_name)
+
+    def close(self):
+        """
+        Stops this process's Chroma system so it holds no handles on the store, e.g. before the
+        store directory is copied. The client can't be used afterwards.
+        """
+        self.client.clear_system_cache()
+
+    @property
+    def partitioned(self) -> bool:
+        return self.layout == "partitioned"
+
+    def partition_names(self) -> List[str]:
+        return list(self.collection.partitions()) if self.partitioned else []
 
     def add_to_vector_db(
             self,
@@ -27,22 +69,112 @@ class ChromaDBClient:
             metadatas=metadatas
         )
 
+    def upsert_to_vector_db(
+            self,
+            ids: List[str],
+            embeddings: List[List[float]],
+            documents: List[str],
+            metadatas: Optional[List[dict]] = None,
+    ):
+        self.collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadatas
+        )
+
+    def update_metadatas(self, ids: List[str], metadatas: List[dict]):
+        """
+        Replaces metadata for existing IDs without touching their documents or embeddings.
+        """
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete_ids(self, ids: List[str], batch_size: int = 500):
+        for start in range(0, len(ids), batch_size):
+            self.collection.delete(ids=ids[start:start + batch_size])
+
     def get_by_id(self, item_id: str):
         try:
             return self.collection.get(ids=[item_id])
         except Exception:
             return {"ids": []}  # Return empty result if not found or failed
 
+    def iter_id_batches(self, batch_size: int = 500) -> Iterator[List[str]]:
+        """
+        Yields IDs in batches from one ID-only snapshot taken up front, so paging never loads
+        documents, metadata or embeddings, and deletes or partition moves made while the caller
+        walks the batches can't shift later pages and skip rows.
+        """
+        ids = self.collection.get(include=[]).get("ids", [])
+        for start in range(0, len(ids), batch_size):
+            yield ids[start:start + batch_size]
+
+    def iter_batches(self, include: List[str], batch_size: int = 500) -> Iterator[dict]:
+        """
+        Yields the collection in batches with the requested fields, fetched by ID for each page.
+        Items deleted after the ID snapshot are simply missing from their batch.
+        """
+        for ids in self.iter_id_batches(batch_size):
+            yield self.collection.get(ids=ids, include=include)
+
+    def get_all_ids(self, batch_size: int = 500) -> List[str]:
+        """
+        Returns every ID in the collection without loading documents or metadata.
+        """
+        return [item_id for ids in self.iter_id_batches(batch_size) for item_id in ids]
+
+    @traced("chroma.get_metadatas")
+    def get_metadatas(self, ids: List[str]) -> List[dict]:
+        """
+        Fetches metadata for the given IDs, preserving the order of `ids` and skipping missing ones.
+        """
+        if not ids:
+            return []
+        result = self.collection.get(ids=[str(item_id) for item_id in ids], include=["metadatas"])
+        by_id = dict(zip(result.get("ids", []), result.get("metadatas", [])))
+        return [by_id[str(item_id)] for item_id in ids if str(item_id) in by_id]
+
+    def get_page(self, ids: List[str], page: int, page_size: int = Config.PAGINATION_IMAGE) -> dict:
+        """
+        Fetches metadata for a single page of `ids`. Only `page_size` items are loaded,
+        so callers can keep just the ID list and a page cursor between requests.
+        """
+        total = len(ids)
+        total_pages = max(1, (total + page_size - 1) // page_size)
+        page = max(0, min(page, total_pages - 1))
+        start = page * page_size
+        end = min(start + page_size, total)
+
+        return {
+            "items": self.get_metadatas(ids[start:end]),
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "total_pages": total_pages,
+        }
+
+    @traced("chroma.query")
     def query(
         self,
         query_embedding: List[float],
         n_results: int = 5,
         where: Optional[dict] = None,
-        include: Optional[List[str]] = None
+        include: Optional[List[str]] = None,
+        partitions: Optional[Iterable[str]] = None
     ):
         """
         Performs similarity search using an embedding, with optional metadata filtering.
+        In the partitioned layout, `partitions` (master categories) limits the search to those
+        collections; otherwise every partition is searched in parallel and the hits merged.
         """
+        if self.partitioned:
+            return self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=where,
+                include=include,
+                partitions=partitions
+            )
         return self.collection.query(
             query_embeddings=[query_embedding],
             n_results=n_results,
@@ -50,25 +182,33 @@ class ChromaDBClient:
             include=include
         )
 
+    def copy_from(self, source: "ChromaDBClient", batch_size: int = 500) -> int:
+        """
+        Copies every item (embedding, document, metadata) from another client, e.g. to move a
+        single-collection store into the partitioned layout.
+        """
+        total = 0
+        for batch in source.iter_batches(include=["embeddings", "documents", "metadatas"], batch_size=batch_size):
+            self.upsert_to_vector_db(
+                ids=batch["ids"],
+                embeddings=[list(vector) for vector in batch["embeddings"]],
+                documents=batch["documents"],
+                metadatas=batch["metadatas"]
+            )
+            total += len(batch["ids"])
+        return total
+
     def export_all_ids_to_csv(self, output_path: str):
         try:
-            all_ids = []
-            offset = 0
-            limit = 500  # Adjustable depending on expected total size
-
-            while True:
-                result = self.collection.get(
-                    offset=offset,
-                    limit=limit
-                )
-                if not result.get('ids'):
-                    break
-                all_ids.extend(result['ids'])
-                offset += limit
-
-            df = pd.DataFrame({"id": all_ids})
-            df.to_csv(output_path, index=False)
-            print(f"✅ Exported {len(all_ids)} IDs to {output_path}")
+            total = 0
+            with open(output_path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["id"])
+                for ids in self.iter_id_batches():
+                    writer.writerows([item_id] for item_id in ids)
+                    total += len(ids)
+
+            print(f"✅ Exported {total} IDs to {output_path}")
         except Exception as e:
             print(f"❌ Failed to export IDs: {e}")
 
@@ -76,51 +216,143 @@ class ChromaDBClient:
         """
         Groups and exports all entries by 'sub_category' into a text file.
         Each group includes ID, document, metadata, and optionally embeddings.
+        Only IDs are held in memory; each group is fetched and written batch by batch.
         """
         try:
-            offset = 0
-            limit = 500
             grouped = {}
+            for batch in self.iter_batches(include=["metadatas"]):
+                for item_id, metadata in zip(batch["ids"], batch["metadatas"]):
+                    sub_category = (metadata or {}).get("sub_category", "Unknown")
+                    grouped.setdefault(sub_category, []).append(item_id)
 
-            while True:
-                result = self.collection.get(
-                    offset=offset,
-                    limit=limit,
-                    include=["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
-                )
-                ids = result.get("ids", [])
-                if not ids:
-                    break
-
-                documents = result.get("documents", [])
-                metadatas = result.get("metadatas", [])
-                embeddings = result.get("embeddings", []) if include_embeddings else []
-
-                for i, item_id in enumerate(ids):
-                    metadata = metadatas[i]
-                    sub_category = metadata.get("sub_category", "Unknown")
-                    if sub_category not in grouped:
-                        grouped[sub_category] = []
-
-                    entry = f"ID: {item_id}\n"
-                    entry += f"Document: {documents[i]}\n"
-                    entry += f"Metadata: {metadata}\n"
-                    if include_embeddings:
-                        entry += f"Embedding: {embeddings[i][:5]}... (truncated)\n"
-                    entry += "-" * 50 + "\n"
-                    grouped[sub_category].append(entry)
-
-                offset += limit
-
+            include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
             with open(output_path, "w", encoding="utf-8") as f:
-                for sub_category, entries in grouped.items():
+                for sub_category, group_ids in grouped.items():
                     f.write(f"\n===== Subcategory: {sub_category} =====\n\n")
-                    f.writelines(entries)
+
+                    for start in range(0, len(group_ids), 500):
+                        result = self.collection.get(ids=group_ids[start:start + 500], include=include)
+                        documents = result.get("documents", [])
+                        metadatas = result.get("metadatas", [])
+                        embeddings = result.get("embeddings", []) if include_embeddings else []
+
+                        for i, item_id in enumerate(result.get("ids", [])):
+                            entry = f"ID: {item_id}\n"
+                            entry += f"Document: {documents[i]}\n"
+                            entry += f"Metadata: {metadatas[i]}\n"
+                            if include_embeddings:
+                                entry += f"Embedding: {embeddings[i][:5]}... (truncated)\n"
+                            entry += "-" * 50 + "\n"
+                            f.write(entry)
 
             print(f"✅ Exported grouped data by sub_category to {output_path}")
         except Exception as e:
             print(f"❌ Failed to export grouped data: {e}")
 
+    def _stream_export(
+            self,
+            write_batch: Callable[[List[str], List[str], List[dict]], None],
+            embeddings_path: Optional[str] = None,
+            batch_size: int = 500,
+    ) -> int:
+        """
+        Streams the collection through `write_batch`. When `embeddings_path` is given, embeddings are
+        written row-aligned with the exported records into a .npy file opened as a memmap. The array
+        is sized from count() up front and resized to the real total if the collection changes
+        mid-export; an empty collection still gets a (0, EMBEDDING_DIM) array.
+        """
+        include = ["documents", "metadatas"] + (["embeddings"] if embeddings_path else [])
+        expected = self.collection.count()
+        tmp_path = f"{embeddings_path}.tmp"
+        embeddings_out = None
+        total = 0
+
+        try:
+            for batch in self.iter_batches(include=include, batch_size=batch_size):
+                ids = batch["ids"]
+                write_batch(ids, batch["documents"], batch["metadatas"])
+
+                if embeddings_path:
+                    vectors = np.asarray(batch["embeddings"], dtype=np.float32)
+                    if embeddings_out is None:
+                        embeddings_out = np.lib.format.open_memmap(
+                            tmp_path, mode="w+", dtype=np.float32, shape=(max(expected, len(ids)), vectors.shape[1])
+                        )
+                    elif total + len(ids) > len(embeddings_out):
+                        capacity = max(2 * len(embeddings_out), total + len(ids))
+                        embeddings_out = _resize_npy(embeddings_out, tmp_path, capacity, total)
+                    embeddings_out[total:total + len(ids)] = vectors
+
+                total += len(ids)
+
+            if embeddings_path and embeddings_out is None:
+                np.save(embeddings_path, np.empty((0, Config.EMBEDDING_DIM), dtype=np.float32))
+            elif embeddings_path:
+                if len(embeddings_out) != total:
+                    embeddings_out = _resize_npy(embeddings_out, tmp_path, total, total)
+                embeddings_out.flush()
+                os.replace(tmp_path, embeddings_path)
+        finally:
+            embeddings_out = None
+            if embeddings_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        if total != expected:
+            print(f"⚠️ Collection changed during export: expected {expected} items, exported {total}")
+        return total
+
+    def export_to_jsonl(self, output_path: str, embeddings_path: Optional[str] = None, batch_size: int = 500):
+        """
+        Writes one JSON object per item (`id`, `document`, `metadata`) incrementally, so memory stays
+        flat regardless of collection size. Embeddings optionally go to a separate .npy file.
+        """
+        try:
+            with open(output_path, "w", encoding="utf-8") as f:
+                def write_batch(ids, documents, metadatas):
+                    for item_id, document, metadata in zip(ids, documents, metadatas):
+                        record = {"id": item_id, "document": document, "metadata": metadata}
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+                total = self._stream_export(write_batch, embeddings_path, batch_size)
+
+            print(f"✅ Exported {total} items to {output_path}")
+        except Exception as e:
+            print(f"❌ Failed to export JSONL: {e}")
+
+    def export_to_parquet(self, output_path: str, embeddings_path: Optional[str] = None, batch_size: int = 500):
+        """
+        Writes `id`, `document` and `metadata` (as a JSON string) to Parquet one row group per batch.
+        Requires pyarrow. Embeddings optionally go to a separate .npy file.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("❌ Parquet export requires pyarrow: pip install pyarrow")
+            return
+
+        schema = pa.schema([
+            ("id", pa.string()),
+            ("document", pa.string()),
+            ("metadata", pa.string()),
+        ])
+
+        try:
+            with pq.ParquetWriter(output_path, schema) as writer:
+                def write_batch(ids, documents, metadatas):
+                    table = pa.table({
+                        "id": ids,
+                        "document": documents,
+                        "metadata": [json.dumps(metadata, ensure_ascii=False) for metadata in metadatas],
+                    }, schema=schema)
+                    writer.write_table(table)
+
+                total = self._stream_export(write_batch, embeddings_path, batch_size)
+
+            print(f"✅ Exported {total} items to {output_path}")
+        except Exception as e:
+            print(f"❌ Failed to export Parquet: {e}")
+
 
 if __name__ == "__main__":
 
@@ -147,8 +379,9 @@ if __name__ == "__main__":
 
     client.export_all_ids_to_csv(Config.SAVED_ID_PATH)
     client.export_all_data_to_txt(Config.SAVED_DATA_PATH, include_embeddings=False)
+    client.export_to_jsonl(Config.SAVED_JSONL_PATH, embeddings_path=Config.SAVED_EMBEDDINGS_PATH)
 
 
-    # Make chroma_store zip file for Huggingface Space
-    # 1. cd chroma_store
-    # 2. zip -r ../chroma_store.zip .
+    # Package chroma_store for Huggingface Space / new serving nodes
+    # 1. python snapshot.py build    (with ingest, catalog sync and the app stopped)
+    # 2. python snapshot.py load --warmup   (on the serving node)
@@ -0,0 +1,293 @@
+import re
+import threading
+from config import Config
+from typing import Dict, Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PARTITION = "uncategorized"
+RESULT_FIELDS = ["documents", "metadatas", "embeddings", "distances", "uris", "data"]
+
+
+def partition_key(master_category: Optional[str]) -> str:
+    key = re.sub(r"[^a-z0-9]+", "_", str(master_category or "").lower()).strip("_")
+    return key or DEFAULT_PARTITION
+
+
+def _as_list(values) -> list:
+    return [] if values is None else list(values)
+
+
+class PartitionedCollection:
+    def __init__(self, client, base_name: str, max_workers: int = Config.VECTOR_PARTITION_WORKERS):
+        """
+        Collection-compatible facade over one Chroma collection per master_category
+        (`<base_name>__<category>`). Writes are routed by each item's master_category;
+        queries go to the requested partitions, or to all of them in parallel with a merged top-k.
+        """
+        self.client = client
+        self.name = base_name
+        self.prefix = f"{base_name}__"
+        self._lock = threading.Lock()
+        self._partitions: Dict[str, object] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chroma-partition")
+        self.refresh()
+
+    def refresh(self):
+        # list_collections returns names in newer Chroma releases and Collection objects in older ones
+        names = [getattr(collection, "name", collection) for collection in self.client.list_collections()]
+        with self._lock:
+            for name in sorted(names):
+                if name.startswith(self.prefix) and name[len(self.prefix):] not in self._partitions:
+                    self._partitions[name[len(self.prefix):]] = self.client.get_collection(name=name)
+
+    def _partition(self, key: str):
+        with self._lock:
+            if key not in self._partitions:
+                self._partitions[key] = self.client.get_or_create_collection(name=f"{self.prefix}{key}")
+            return self._partitions[key]
+
+    def partitions(self, keys: Optional[Iterable[str]] = None) -> Dict[str, object]:
+        with self._lock:
+            if keys is None:
+                return dict(sorted(self._partitions.items()))
+            return {key: self._partitions[key] for key in sorted(set(keys)) if key in self._partitions}
+
+    def drop_partition(self, master_category: str):
+        """
+        Deletes one category's collection. Re-running ingest then re-embeds just that category,
+        since DataEmbedder skips IDs that are still stored.
+        """
+        key = partition_key(master_category)
+        with self._lock:
+            if self._partitions.pop(key, None) is not None:
+                self.client.delete_collection(name=f"{self.prefix}{key}")
+
+    def count(self) -> int:
+        return sum(collection.count() for collection in self.partitions().values())
+
+    def _group_by_partition(self, ids: List[str], metadatas: Optional[List[dict]], **columns) -> Dict[str, dict]:
+        groups: Dict[str, dict] = {}
+        for i, item_id in enumerate(ids):
+            key = partition_key((metadatas[i] or {}).get("master_category") if metadatas else None)
+            group = groups.setdefault(key, {"ids": [], "metadatas": [] if metadatas else None,
+                                            **{name: [] for name, values in columns.items() if values is not None}})
+            group["ids"].append(item_id)
+            if metadatas:
+                group["metadatas"].append(metadatas[i])
+            for name, values in columns.items():
+                if values is not None:
+                    group[name].append(values[i])
+        return groups
+
+    def add(self, ids: List[str], embeddings=None, documents=None, metadatas=None, **kwargs):
+        for key, group in self._group_by_partition(ids, metadatas, embeddings=embeddings, documents=documents).items():
+            self._partition(key).add(**group, **kwargs)
+
+    def upsert(self, ids: List[str], embeddings=None, documents=None, metadatas=None, **kwargs):
+        groups = self._group_by_partition(ids, metadatas, embeddings=embeddings, documents=documents)
+        for key, group in groups.items():
+            # A product whose category changed must not linger in its old partition
+            for other_key, collection in self.partitions().items():
+                if other_key != key:
+                    collection.delete(ids=group["ids"])
+            self._partition(key).upsert(**group, **kwargs)
+
+    def _locate(self, ids: List[str]) -> Dict[str, str]:
+        located = {}
+        for key, collection in self.partitions().items():
+            for item_id in collection.get(ids=ids, include=[])["ids"]:
+                located[item_id] = key
+        return located
+
+    def update(self, ids: List[str], embeddings=None, documents=None, metadatas=None, **kwargs):
+        """
+        Updates items in place, moving them (with their stored embedding and document) when
+        their master_category changed. IDs that aren't stored are skipped, as Chroma does.
+        """
+        located = self._locate(ids)
+        in_place: Dict[str, List[int]] = {}
+        moves: List[int] = []
+        for i, item_id in enumerate(ids):
+            key = located.get(item_id)
+            if key is None:
+                continue
+            metadata = metadatas[i] if metadatas is not None else None
+            # An absent or None master_category leaves the item where it is
+            if metadata and metadata.get("master_category") is not None and partition_key(metadata["master_category"]) != key:
+                moves.append(i)
+            else:
+                in_place.setdefault(key, []).append(i)
+
+        partitions = self.partitions()
+        for key, rows in in_place.items():
+            partitions[key].update(
+                ids=[ids[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows] if embeddings is not None else None,
+                documents=[documents[i] for i in rows] if documents is not None else None,
+                metadatas=[metadatas[i] for i in rows] if metadatas is not None else None,
+                **kwargs
+            )
+        if not moves:
+            return
+
+        stored = self.get(ids=[ids[i] for i in moves], include=["embeddings", "documents", "metadatas"])
+        by_id = {
+            item_id: (embedding, document, metadata)
+            for item_id, embedding, document, metadata in zip(
+                stored["ids"], stored.get("embeddings") or [], stored.get("documents") or [], stored.get("metadatas") or []
+            )
+        }
+        moves = [i for i in moves if ids[i] in by_id]
+        # Chroma merges updated metadata into the stored one, and None clears a key
+        moved_metadatas = [
+            {key: value for key, value in {**(by_id[ids[i]][2] or {}), **metadatas[i]}.items() if value is not None}
+            for i in moves
+        ]
+        self.upsert(
+            ids=[ids[i] for i in moves],
+            embeddings=[list(embeddings[i] if embeddings is not None else by_id[ids[i]][0]) for i in moves],
+            documents=[documents[i] if documents is not None else by_id[ids[i]][1] for i in moves],
+            metadatas=moved_metadatas,
+        )
+
+    def delete(self, ids: List[str], **kwargs):
+        for collection in self.partitions().values():
+            collection.delete(ids=ids, **kwargs)
+
+    def _merge(self, results: List[dict]) -> dict:
+        merged = {"ids": []}
+        for result in results:
+            merged["ids"].extend(result.get("ids") or [])
+            for field in RESULT_FIELDS:
+                if result.get(field) is not None:
+                    merged.setdefault(field, []).extend(_as_list(result[field]))
+        return merged
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[dict] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, include: Optional[List[str]] = None, **kwargs) -> dict:
+        """
+        Same contract as Collection.get. Offset paging walks the partitions in name order,
+        so `iter_id_batches` sees one stable global sequence; a `limit` without an offset
+        applies to the merged result.
+        """
+        options = dict(kwargs, where=where)
+        if include is not None:
+            options["include"] = include
+        collections = list(self.partitions().values())
+
+        if ids is not None or offset is None:
+            merged = self._merge([collection.get(ids=ids, limit=limit, **options) for collection in collections])
+            return self._truncate(merged, limit)
+
+        if where is not None:
+            # Partition sizes don't say how many items match, so page over the matching IDs instead
+            matching = [item_id for collection in collections for item_id in collection.get(where=where, include=[])["ids"]]
+            page = matching[offset:offset + limit if limit is not None else None]
+            return self.get(ids=page, include=include, **kwargs) if page else self._merge([])
+
+        skip, remaining, results = offset, limit, []
+        for collection in collections:
+            size = collection.count()
+            if skip >= size:
+                skip -= size
+                continue
+            result = collection.get(offset=skip, limit=remaining, **options)
+            results.append(result)
+            skip = 0
+            if remaining is not None:
+                remaining -= len(result.get("ids") or [])
+                if remaining <= 0:
+                    break
+        return self._merge(results)
+
+    @staticmethod
+    def _truncate(result: dict, limit: Optional[int]) -> dict:
+        if limit is None or len(result["ids"]) <= limit:
+            return result
+        return {field: values[:limit] for field, values in result.items()}
+
+    def _query_partitions(self, collections: Iterable, query_embeddings, n_results: int, options: dict) -> List[dict]:
+        futures = [
+            self._executor.submit(collection.query, query_embeddings=query_embeddings,
+                                  n_results=min(n_results, size), **options)
+            for collection, size in ((collection, collection.count()) for collection in collections)
+            if size
+        ]
+        return [future.result() for future in futures]
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[dict] = None,
+              include: Optional[List[str]] = None, partitions: Optional[Iterable[str]] = None, **kwargs) -> dict:
+        """
+        Queries the given partitions (all when None or none of them exist) in parallel and
+        merges each query's hits by distance into a single top `n_results`. Routing is a
+        preference, not a filter: when the routed partitions return fewer than `n_results`
+        hits for any query, the remaining partitions are searched too.
+        """
+        requested = list(include) if include is not None else ["metadatas", "documents", "distances"]
+        # Distances are needed to merge partitions even when the caller didn't ask for them
+        options = dict(kwargs, where=where, include=requested + ([] if "distances" in requested else ["distances"]))
+
+        targets = self.partitions([partition_key(p) for p in partitions]) if partitions else {}
+        targets = targets or self.partitions()
+        results = self._query_partitions(targets.values(), query_embeddings, n_results, options)
+
+        if any(sum(len(result["ids"][q]) for result in results) < n_results for q in range(len(query_embeddings))):
+            rest = [collection for key, collection in self.partitions().items() if key not in targets]
+            results += self._query_partitions(rest, query_embeddings, n_results, options)
+
+        fields = [field for field in RESULT_FIELDS if field in options["include"]]
+        merged = {"ids": [], **{field: [] for field in fields}}
+        for query_index in range(len(query_embeddings)):
+            hits = [
+                (result["distances"][query_index][rank], result_index, rank)
+                for result_index, result in enumerate(results)
+                for rank in range(len(result["ids"][query_index]))
+            ]
+            hits.sort(key=lambda hit: hit[0])
+            hits = hits[:n_results]
+
+            merged["ids"].append([results[r]["ids"][query_index][rank] for _, r, rank in hits])
+            for field in fields:
+                merged[field].append([
+                    results[r][field][query_index][rank] if results[r].get(field) is not None else None
+                    for _, r, rank in hits
+                ])
+
+        if "distances" not in requested:
+            merged.pop("distances")
+        return merged
+
+
+if __name__ == "__main__":
+    import argparse
+    from vector_db import ChromaDBClient
+
+    parser = argparse.ArgumentParser(description="Manage the category-partitioned vector layout.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate", help="Copy the single collection into per-category partitions")
+    subparsers.add_parser("stats", help="Show item counts per partition")
+    drop_parser = subparsers.add_parser("drop", help="Drop one category's partition so ingest rebuilds it")
+    drop_parser.add_argument("master_category")
+    args = parser.parse_args()
+
+    partitioned = ChromaDBClient(
+        collection_name=Config.VECTOR_COLLECTION_NAME,
+        persist_directory=Config.VECTOR_PERSIST_DIRECTORY,
+        layout="partitioned"
+    )
+
+    if args.command == "migrate":
+        single = ChromaDBClient(
+            collection_name=Config.VECTOR_COLLECTION_NAME,
+            persist_directory=Config.VECTOR_PERSIST_DIRECTORY,
+            layout="single"
+        )
+        copied = partitioned.copy_from(single)
+        print(f"✅ Copied {copied} items into {len(partitioned.partition_names())} partitions; "
+              f"set VECTOR_LAYOUT = \"partitioned\" to serve from them")
+    elif args.command == "drop":
+        partitioned.collection.drop_partition(args.master_category)
+        print(f"🗑️ Dropped partition for {args.master_category}")
+
+    for key, collection in partitioned.collection.partitions().items():
+        print(f"  {key}: {collection.count()}")
@@ -1,61 +1,61 @@
-import torch
-torch.classes.__path__ = []
+from startup_profiler import profiler
 
-import re
-import pandas as pd
 import streamlit as st
 from config import Config
-from vector_db import ChromaDBClient
-from data_retriever import DataRetriever
+import app_resources
+from telemetry import metrics, traced
 from utils import category, metadata_fields
 
 st.set_page_config(page_title="Fashion Recommender", layout="wide")
 
 
 class WebApp:
-    def __init__(self, csv_path: str):
-        self.csv_path = csv_path
+    def __init__(self):
+        # Heavy objects live in the process-wide registry and are reached through properties,
+        # so the gallery can render before warmup finishes; only lightweight state is per session
         self.img_count = Config.PER_CATEGORY_IMAGE
-        self.df = pd.read_csv(self.csv_path, dtype=str)
         self.category_tree = category.get_category_tree()
-        self.chroma_client = ChromaDBClient(
-            collection_name=Config.VECTOR_COLLECTION_NAME,
-            persist_directory=Config.VECTOR_PERSIST_DIRECTORY
-        )
-        self.retriever = DataRetriever(
-            vector_db_client=self.chroma_client,
-        )
+        self.thumbnails = app_resources.get_thumbnail_cache()
         if "selected_product_id" not in st.session_state:
             st.session_state["selected_product_id"] = None
-        if "subcategory_products" not in st.session_state:
-            st.session_state["subcategory_products"] = []
+        if "subcategory_ids" not in st.session_state:
+            st.session_state["subcategory_ids"] = []
         if "subcategory_page" not in st.session_state:
             st.session_state["subcategory_page"] = 0
-        if "search_results" not in st.session_state:
-            st.session_state["search_results"] = []
+        if "search_result_ids" not in st.session_state:
+            st.session_state["search_result_ids"] = []
         if "search_page" not in st.session_state:
             st.session_state["search_page"] = 0
 
-    def handle_category_selection(self, master_category, sub_category):
-        clean_master = self.clean_label(master_category)
-        clean_sub = self.clean_label(sub_category)
-
-        filtered_df = self.df[
-            (self.df["master_category"] == clean_master) &
-            (self.df["sub_category"] == clean_sub)
-        ]
-        product_ids = sorted(filtered_df["product_id"].unique())
-
-        results = self.chroma_client.collection.get(
-            ids=[str(pid) for pid in product_ids],
-            include=["metadatas"]
-        )
-        metadatas = results.get("metadatas", [])
+    @property
+    def category_index(self):
+        return app_resources.get_gallery_index()
+
+    @property
+    def chroma_client(self):
+        # Blocks until the client is built if warmup hasn't reached it yet
+        return app_resources.get_chroma_client()
+
+    @property
+    def retriever(self):
+        return app_resources.get_retriever()
+
+    @property
+    def facet_index(self):
+        # Facets and recommendations stay hidden until warmup has loaded them
+        return app_resources.get_facet_index() if app_resources.is_loaded("facet_index") else None
+
+    @property
+    def similar_items(self):
+        return app_resources.get_similar_items() if app_resources.is_loaded("similar_items") else None
 
-        st.session_state["subcategory_products"] = metadatas
+    def handle_category_selection(self, master_category, sub_category):
+        # Session state only keeps the ID list and a page cursor; metadata is fetched per page
+        st.session_state["subcategory_ids"] = self.category_index.get_product_ids(master_category, sub_category)
         st.session_state["subcategory_page"] = 0
-        st.session_state["search_results"] = []
+        st.session_state["search_result_ids"] = []
 
+    @traced("render.sidebar")
     def render_sidebar(self, col):
         with col:
             st.markdown("<h2 style='margin-bottom: 20px;'>🛍️ Categories</h2>", unsafe_allow_html=True)
@@ -93,16 +93,110 @@ class WebApp:
                             st.session_state["expanded_master"] = master_with_icon
                             self.handle_category_selection(master_with_icon, sub)
 
+            self.render_facet_filters()
+
+            if Config.TELEMETRY_DEBUG_PANEL and metrics.enabled:
+                self.render_metrics_panel()
+
+    def current_facet_filters(self):
+        if self.facet_index is None:
+            return {}
+        return {
+            field: st.session_state.get(f"facet_{field}", [])
+            for field in self.facet_index.fields
+            if st.session_state.get(f"facet_{field}")
+        }
+
+    def current_price_range(self):
+        if self.facet_index is None:
+            return None
+        selected = st.session_state.get("facet_price")
+        if not selected or tuple(selected) == self.price_slider_bounds():
+            return None
+        return tuple(selected)
+
+    def price_slider_bounds(self):
+        low, high = self.facet_index.price_bounds()
+        return int(low), int(high) + (1 if high > int(high) else 0)
+
+    def apply_facets(self, product_ids):
+        facet_filters, price_range = self.current_facet_filters(), self.current_price_range()
+        if self.facet_index is None or (not facet_filters and not price_range):
+            return product_ids
+        return self.facet_index.filter_ids(product_ids, facet_filters, price_range)
+
+    def reset_pages(self):
+        st.session_state["subcategory_page"] = 0
+        st.session_state["search_page"] = 0
+        st.session_state["selected_product_id"] = None
+
+    def clear_facet_filters(self):
+        for field in self.facet_index.fields:
+            st.session_state[f"facet_{field}"] = []
+        st.session_state["facet_price"] = self.price_slider_bounds()
+        self.reset_pages()
+
+    @traced("render.facet_filters")
+    def render_facet_filters(self):
+        if self.facet_index is None or not self.facet_index.size:
+            return
+
+        facet_filters, price_range = self.current_facet_filters(), self.current_price_range()
+        # Counts follow the current subcategory; bitmaps make this a handful of integer ANDs per rerun
+        subcategory_ids = st.session_state.get("subcategory_ids")
+        base = self.facet_index.bitmap_for_ids(subcategory_ids) if subcategory_ids else None
+        counts = self.facet_index.counts(facet_filters, price_range, base)
+
+        with st.expander("🎛️ Filters", expanded=bool(facet_filters or price_range)):
+            for field, label in metadata_fields.get_facet_fields():
+                selected = facet_filters.get(field, [])
+                options = [
+                    value for value in self.facet_index.values(field)
+                    if counts.get(field, {}).get(value) or value in selected
+                ]
+                st.multiselect(
+                    label,
+                    options,
+                    key=f"facet_{field}",
+                    format_func=lambda value, field=field: f"{value} ({counts.get(field, {}).get(value, 0)})",
+                    on_change=self.reset_pages
+                )
+
+            low, high = self.price_slider_bounds()
+            if high > low:
+                if "facet_price" not in st.session_state:
+                    st.session_state["facet_price"] = (low, high)
+                st.slider("Price", min_value=low, max_value=high, key="facet_price", on_change=self.reset_pages)
+
+            matching = self.facet_index.filter(facet_filters, price_range, base).bit_count()
+            st.caption(f"{matching} matching products")
+            st.button("✖️ Clear filters", key="clear_facets", on_click=self.clear_facet_filters)
+
+    def render_metrics_panel(self):
+        with st.expander("🚀 Startup profile"):
+            st.json({"warmup": app_resources.warmup_status(), **profiler.report()})
+
+        with st.expander("📈 Latency metrics"):
+            summary = metrics.summary()
+            if summary:
+                st.dataframe(
+                    [{"stage": stage, **row} for stage, row in sorted(summary.items())],
+                    hide_index=True,
+                    use_container_width=True
+                )
+            else:
+                st.caption("No spans recorded yet.")
+            st.code(metrics.export_prometheus(), language="text")
+
     def clean_label(self, text):
-        return re.sub(r"[^\w\s&]+", "", text).strip()
+        return category.clean_label(text)
 
+    @traced("render.main_gallery")
     def render_main_gallery(self, col):
         with col:
             st.markdown("<h2 style='margin-bottom: 20px;'>🖼️ Product Gallery</h2>", unsafe_allow_html=True)
 
             for master, sub_dict in self.category_tree.items():
-                clean_master = self.clean_label(master)
-
                 st.markdown(f"""
                     <div style="background-color:#f7e9e3;padding:10px;border-radius:8px;margin-top:20px;margin-bottom:10px">
                         <h3 style="margin:0">{master}</h3>
@@ -110,23 +204,7 @@ class WebApp:
                 """, unsafe_allow_html=True)
 
                 for sub, _ in sub_dict.items():
-                    clean_sub = self.clean_label(sub)
-
-                    filtered_df = self.df[
-                        (self.df["master_category"] == clean_master) &
-                        (self.df["sub_category"] == clean_sub)
-                    ]
-
-                    product_ids = sorted(filtered_df["product_id"].unique())
-
-                    if not product_ids:
-                        continue
-
-                    results = self.chroma_client.collection.get(
-                        ids=[str(pid) for pid in product_ids],
-                        include=["metadatas"]
-                    )
-                    metadatas = results.get("metadatas", [])[:self.img_count]
+                    metadatas = self.category_index.get_preview(master, sub)
 
                     if metadatas:
                         st.markdown(f"""
@@ -135,164 +213,100 @@ class WebApp:
                             </div>
                         """, unsafe_allow_html=True)
 
-                        cols = st.columns(4)
-                        for i, metadata in enumerate(metadatas):
-                            product_id = metadata.get("product_id")
-                            product_name = metadata.get("product_name", "N/A")
-                            brand = metadata.get("brand", "Unknown")
-                            price = metadata.get("price", "N/A")
-                            image_url = metadata.get("image_url")
-
-                            with cols[i % 4]:
-                                st.markdown(f"""
-                                    <div style="display: flex; flex-direction: column; height: 320px; justify-content: space-between;">
-                                        <img src="{image_url}" style="width: 100%; border-radius: 6px" />
-                                        <div style="margin-top: 10px; flex-grow: 1;">
-                                            <strong>{product_name}</strong><br/>
-                                            <span style="font-size: 12px;">Brand: {brand} | Price: ¥{price}</span>
-                                        </div>
-                                    </div>
-                                """, unsafe_allow_html=True)
-
-                                if st.button("🔍 View Details", key=f"view-{product_id}"):
-                                    st.session_state["selected_product_id"] = product_id
+                        self.render_product_grid(metadatas, key_prefix="view")
 
+    def render_page_controls(self, page_state_key: str, total_pages: int, key_prefix: str = ""):
+        page = st.session_state[page_state_key]
+
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if page > 0 and st.button("⬅️ Prev Page", key=f"{key_prefix}prev"):
+                st.session_state[page_state_key] -= 1
+                st.session_state["selected_product_id"] = None
+                st.rerun()
+
+        with col3:
+            if page < total_pages - 1 and st.button("➡️ Next Page", key=f"{key_prefix}next"):
+                st.session_state[page_state_key] += 1
+                st.session_state["selected_product_id"] = None
+                st.rerun()
+
+        st.markdown(f"<div style='text-align:center; color:gray;'>Page {page + 1} of {total_pages}</div>",
+                    unsafe_allow_html=True)
+
+    def render_product_grid(self, metadatas, key_prefix: str):
+        cols = st.columns(4)
+        for i, metadata in enumerate(metadatas):
+            product_id = metadata.get("product_id")
+            product_name = metadata.get("product_name", "N/A")
+            brand = metadata.get("brand", "Unknown")
+            price = metadata.get("price", "N/A")
+            image_src = self.thumbnails.card_src(metadata.get("image_url"))
+
+            with cols[i % 4]:
+                st.markdown(f"""
+                    <div style="display: flex; flex-direction: column; height: 320px; justify-content: space-between;">
+                        <img src="{image_src}" loading="lazy" decoding="async" style="width: 100%; border-radius: 6px;" />
+                        <div style="margin-top: 10px; flex-grow: 1;">
+                            <strong>{product_name}</strong><br/>
+                            <span style="font-size: 12px;">Brand: {brand} | Price: ¥{price}</span>
+                        </div>
+                    </div>
+                """, unsafe_allow_html=True)
+
+                if st.button("🔍 View Details", key=f"{key_prefix}-{product_id}"):
+                    st.session_state["selected_product_id"] = product_id
+
+    @traced("render.subcategory_gallery")
     def render_subcategory_gallery(self, col):
         with col:
             sub_title = st.session_state.get("selected_sub", "Subcategory")
             st.markdown(f"<h2 style='margin-bottom: 20px;'>🖼️ {sub_title}</h2>", unsafe_allow_html=True)
 
             if st.button("🔙 Back to All Categories"):
-                st.session_state["subcategory_products"] = []
+                st.session_state["subcategory_ids"] = []
                 st.session_state["subcategory_page"] = 0
                 st.session_state["selected_product_id"] = None
                 st.rerun()
 
-            metadatas = st.session_state.get("subcategory_products", [])
-            if not metadatas:
+            product_ids = self.apply_facets(st.session_state.get("subcategory_ids", []))
+            if not product_ids:
                 st.info("No products to display.")
                 return
 
-            if "subcategory_page" not in st.session_state:
-                st.session_state["subcategory_page"] = 0
-
-            items_per_page = Config.PAGINATION_IMAGE
-            total_items = len(metadatas)
-            total_pages = (total_items + items_per_page - 1) // items_per_page
-
-            page = st.session_state["subcategory_page"]
-            page = max(0, min(page, total_pages - 1))
-            st.session_state["subcategory_page"] = page
-
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col1:
-                if page > 0 and st.button("⬅️ Prev Page"):
-                    st.session_state["subcategory_page"] -= 1
-                    st.session_state["selected_product_id"] = None
-                    st.rerun()
-
-            with col3:
-                if page < total_pages - 1 and st.button("➡️ Next Page"):
-                    st.session_state["subcategory_page"] += 1
-                    st.session_state["selected_product_id"] = None
-                    st.rerun()
-
-            # Refresh page after possible rerun
-            page = st.session_state["subcategory_page"]
-            start = page * items_per_page
-            end = min(start + items_per_page, total_items)
-            paged_items = metadatas[start:end]
-
-            st.markdown(f"<div style='text-align:center; color:gray;'>Page {page + 1} of {total_pages}</div>",
-                        unsafe_allow_html=True)
-
-            cols = st.columns(4)
-            for i, metadata in enumerate(paged_items):
-                product_id = metadata.get("product_id")
-                product_name = metadata.get("product_name", "N/A")
-                brand = metadata.get("brand", "Unknown")
-                price = metadata.get("price", "N/A")
-                image_url = metadata.get("image_url")
-
-                with cols[i % 4]:
-                    st.markdown(f"""
-                        <div style="display: flex; flex-direction: column; height: 320px; justify-content: space-between;">
-                            <img src="{image_url}" style="width: 100%; border-radius: 6px;" />
-                            <div style="margin-top: 10px; flex-grow: 1;">
-                                <strong>{product_name}</strong><br/>
-                                <span style="font-size: 12px;">Brand: {brand} | Price: ¥{price}</span>
-                            </div>
-                        </div>
-                    """, unsafe_allow_html=True)
+            result_page = self.chroma_client.get_page(
+                product_ids, st.session_state["subcategory_page"], Config.PAGINATION_IMAGE
+            )
+            st.session_state["subcategory_page"] = result_page["page"]
 
-                    if st.button("🔍 View Details", key=f"view-details-{product_id}-{page}"):
-                        st.session_state["selected_product_id"] = product_id
+            self.render_page_controls("subcategory_page", result_page["total_pages"])
+            self.render_product_grid(result_page["items"], key_prefix=f"view-details-{result_page['page']}")
 
+    @traced("render.search_result_gallery")
     def render_search_result_gallery(self, col):
         with col:
             st.markdown(f"<h2 style='margin-bottom: 20px;'>🔍 Search Results</h2>", unsafe_allow_html=True)
 
             if st.button("🔙 Back to All Categories"):
-                st.session_state["search_results"] = []
+                st.session_state["search_result_ids"] = []
                 st.session_state["search_page"] = 0
                 st.session_state["selected_product_id"] = None
                 st.rerun()
 
-            metadatas = st.session_state.get("search_results", [])
-            if not metadatas:
+            product_ids = self.apply_facets(st.session_state.get("search_result_ids", []))
+            if not product_ids:
                 st.info("No matching products found.")
                 return
 
-            items_per_page = Config.PAGINATION_IMAGE
-            total_items = len(metadatas)
-            total_pages = (total_items + items_per_page - 1) // items_per_page
-
-            page = st.session_state["search_page"]
-            page = max(0, min(page, total_pages - 1))
-            st.session_state["search_page"] = page
-
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col1:
-                if page > 0 and st.button("⬅️ Prev Page", key="search_prev"):
-                    st.session_state["search_page"] -= 1
-                    st.session_state["selected_product_id"] = None
-                    st.rerun()
-
-            with col3:
-                if page < total_pages - 1 and st.button("➡️ Next Page", key="search_next"):
-                    st.session_state["search_page"] += 1
-                    st.session_state["selected_product_id"] = None
-                    st.rerun()
-
-            page = st.session_state["search_page"]
-            start = page * items_per_page
-            end = min(start + items_per_page, total_items)
-            paged_items = metadatas[start:end]
-
-            st.markdown(f"<div style='text-align:center; color:gray;'>Page {page + 1} of {total_pages}</div>", unsafe_allow_html=True)
-
-            cols = st.columns(4)
-            for i, metadata in enumerate(paged_items):
-                product_id = metadata.get("product_id")
-                product_name = metadata.get("product_name", "N/A")
-                brand = metadata.get("brand", "Unknown")
-                price = metadata.get("price", "N/A")
-                image_url = metadata.get("image_url")
-
-                with cols[i % 4]:
-                    st.markdown(f"""
-                        <div style="display: flex; flex-direction: column; height: 320px; justify-content: space-between;">
-                            <img src="{image_url}" style="width: 100%; border-radius: 6px;" />
-                            <div style="margin-top: 10px; flex-grow: 1;">
-                                <strong>{product_name}</strong><br/>
-                                <span style="font-size: 12px;">Brand: {brand} | Price: ¥{price}</span>
-                            </div>
-                        </div>
-                    """, unsafe_allow_html=True)
+            result_page = self.chroma_client.get_page(
+                product_ids, st.session_state["search_page"], Config.PAGINATION_IMAGE
+            )
+            st.session_state["search_page"] = result_page["page"]
 
-                    if st.button("🔍 View Details", key=f"search-view-details-{product_id}-{page}"):
-                        st.session_state["selected_product_id"] = product_id
+            self.render_page_controls("search_page", result_page["total_pages"], key_prefix="search_")
+            self.render_product_grid(result_page["items"], key_prefix=f"search-view-details-{result_page['page']}")
 
+    @traced("render.product_detail")
     def render_product_detail(self, col):
         with col:
             st.markdown("<h2 style='margin-bottom: 20px;'>📋 Product Details</h2>", unsafe_allow_html=True)
@@ -316,7 +330,8 @@ class WebApp:
             with detail_placeholder.container():
                 image_url = metadata.get("image_url")
                 if image_url:
-                    st.image(image_url, use_container_width=True)
+                    image_path = self.thumbnails.get_path(image_url, Config.THUMBNAIL_DETAIL_WIDTH)
+                    st.image(image_path or image_url, use_container_width=True)
 
                 fields_to_display = metadata_fields.get_metadata_display_fields()
                 for key, label in fields_to_display:
@@ -324,6 +339,8 @@ class WebApp:
                     if value:
                         st.markdown(f"**{label}:** {value}")
 
+                self.render_similar_items(product_id)
+
                 if st.button("🔙 Clear", key="clear_button"):
                     st.session_state["clear_detail"] = True
 
@@ -333,23 +350,75 @@ class WebApp:
                 detail_placeholder.empty()
                 detail_placeholder.info("Click Details button to see details of product here.")
 
+    @traced("render.similar_items")
+    def render_similar_items(self, product_id):
+        if self.similar_items is None:
+            return
+        # Neighbours are precomputed, so this is a lookup plus one metadata fetch
+        similar_ids = self.similar_items.get_similar_ids(product_id, Config.SIMILAR_ITEMS_DISPLAY)
+        similar = self.chroma_client.get_metadatas(similar_ids)
+        if not similar:
+            return
+
+        st.markdown("#### 🧩 Similar Items")
+        cols = st.columns(len(similar))
+        for col, metadata in zip(cols, similar):
+            with col:
+                image_src = self.thumbnails.card_src(metadata.get("image_url"))
+                st.markdown(f"""
+                    <img src="{image_src}" loading="lazy" decoding="async" style="width: 100%; border-radius: 6px;" />
+                    <div style="font-size: 11px; margin-top: 4px;">{metadata.get("product_name", "N/A")}</div>
+                """, unsafe_allow_html=True)
+                if st.button("View", key=f"similar-{product_id}-{metadata.get('product_id')}"):
+                    st.session_state["selected_product_id"] = metadata.get("product_id")
+                    st.rerun()
+
+    @traced("render.chat_input")
     def render_chat_input(self):
-        user_query = st.chat_input("💬 search fashion products...")
+        ready = app_resources.is_ready()
+        user_query = st.chat_input(
+            "💬 search fashion products..." if ready else "⏳ search is warming up...",
+            disabled=not ready
+        )
+        if not ready:
+            self.render_warmup_status()
         if user_query:
             st.session_state["user_query"] = user_query
-            search_results = self.retriever.search(user_query)
-            st.session_state["search_results"] = search_results
+            search_results = self.retriever.search(
+                user_query,
+                facet_filters=self.current_facet_filters(),
+                price_range=self.current_price_range(),
+                # While browsing a category, search within it (routes to its partition when partitioned)
+                selected_master=st.session_state.get("selected_master") if st.session_state.get("subcategory_ids") else None
+            ) or []
+            st.session_state["search_result_ids"] = [
+                str(metadata["product_id"]) for metadata in search_results if metadata.get("product_id")
+            ]
             st.session_state["search_page"] = 0
             st.session_state["selected_product_id"] = None
             st.rerun()
 
+    @st.fragment(run_every=1.0)
+    def render_warmup_status(self):
+        # Polls warmup without rerunning the whole page; one full rerun enables the chat input
+        status = app_resources.warmup_status()
+        if status["ready"]:
+            st.rerun()
+        elif status["error"]:
+            st.error(f"Search is unavailable: {status['error']}")
+            if st.button("🔁 Retry", key="retry_warmup"):
+                # A full rerun restarts warmup through start_background_warmup()
+                st.rerun(scope="app")
+        else:
+            st.caption(f"⏳ Preparing search ({status['stage']})...")
+
     def render(self):
         col_sidebar, col_main, col_detail = st.columns([2, 5, 3])
         self.render_sidebar(col_sidebar)
 
-        if st.session_state.get("search_results"):
+        if st.session_state.get("search_result_ids"):
             self.render_search_result_gallery(col_main)
-        elif st.session_state.get("subcategory_products"):
+        elif st.session_state.get("subcategory_ids"):
             self.render_subcategory_gallery(col_main)
         else:
             self.render_main_gallery(col_main)
@@ -359,6 +428,11 @@ class WebApp:
 
 
 if __name__ == "__main__":
-    style_csv = Config.STYLE_CSV
-    app = WebApp(csv_path=style_csv)
+    # No-op after the first run: resources are shared across reruns and sessions
+    if Config.STARTUP_MODE == "background":
+        app_resources.start_background_warmup()
+    else:
+        app_resources.warmup()
+    app = WebApp()
     app.render()
+    profiler.mark("first_render")